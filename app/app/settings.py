@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "rest_framework.authtoken",
     "core",
@@ -46,6 +47,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "core.middleware.ReplicaRoutingMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -78,17 +80,53 @@ WSGI_APPLICATION = "app.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# DB_POOL=1 checks connections out of an in-process pool shared by the
+# threads of a worker; connections go back to the pool after each request.
+# Otherwise DB_CONN_MAX_AGE keeps one persistent connection per thread.
+DB_POOL = os.environ.get("DB_POOL", "0") == "1"
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": (
+            "core.db.backends.postgresql_pool"
+            if DB_POOL
+            else "django.db.backends.postgresql"
+        ),
         "HOST": os.environ.get("DB_HOST"),
         "NAME": os.environ.get("DB_NAME"),
         "USER": os.environ.get("DB_USER"),
         "PASSWORD": os.environ.get("DB_PASS"),
+        "CONN_MAX_AGE": 0 if DB_POOL else int(os.environ.get("DB_CONN_MAX_AGE", 60)),
+        "POOL": {
+            "MAX_SIZE": int(os.environ.get("DB_POOL_MAX_SIZE", 10)),
+            "IDLE_TIMEOUT": int(os.environ.get("DB_POOL_IDLE_TIMEOUT", 300)),
+            "TIMEOUT": int(os.environ.get("DB_POOL_TIMEOUT", 30)),
+            "CHECK": os.environ.get("DB_POOL_CHECK", "1") == "1",
+        },
     }
 }
 
 
+# Read replicas, one per host in DB_REPLICA_HOSTS. Safe requests read from a
+# replica unless the client wrote within the last DB_REPLICA_STICKY_SECONDS.
+DB_REPLICA_HOSTS = [
+    host for host in os.environ.get("DB_REPLICA_HOSTS", "").split(",") if host
+]
+
+for index, host in enumerate(DB_REPLICA_HOSTS):
+    DATABASES[f"replica_{index}"] = dict(
+        DATABASES["default"], HOST=host, TEST={"MIRROR": "default"}
+    )
+
+DATABASE_ROUTERS = ["core.db.routers.PrimaryReplicaRouter"]
+
+DATABASE_REPLICA_ROUTING = {
+    "REPLICAS": [f"replica_{index}" for index in range(len(DB_REPLICA_HOSTS))],
+    "STICKY_SECONDS": int(os.environ.get("DB_REPLICA_STICKY_SECONDS", 5)),
+    "CACHE_ALIAS": os.environ.get("DB_REPLICA_STICKY_CACHE_ALIAS", "default"),
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -124,4 +162,64 @@ MEDIA_URL = "/media/"
 STATIC_ROOT = "/vol/web/static"
 MEDIA_ROOT = "/vol/web/media"
 
+# How media files are delivered: "file" streams them from Django, while
+# "x-accel-redirect" (nginx) and "x-sendfile" (Apache) hand the transfer to
+# the front server once access has been checked.
+MEDIA_DELIVERY = os.environ.get("MEDIA_DELIVERY", "file")
+MEDIA_ACCEL_PREFIX = os.environ.get("MEDIA_ACCEL_PREFIX", "/protected-media/")
+
+RECIPE_IMAGE_WORKERS = int(os.environ.get("RECIPE_IMAGE_WORKERS", 2))
+RECIPE_IMAGE_MAX_BYTES = int(os.environ.get("RECIPE_IMAGE_MAX_BYTES", 10 * 2 ** 20))
+RECIPE_IMAGE_MAX_PIXELS = int(os.environ.get("RECIPE_IMAGE_MAX_PIXELS", 40000000))
+
 AUTH_USER_MODEL = "core.User"
+
+
+# Caches
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+
+# The response cache, token cache and replica pins must be seen by every
+# worker process, so they use memcached when MEMCACHED_HOSTS is set. Without
+# it they are local to the process and gunicorn runs a single worker.
+MEMCACHED_HOSTS = [
+    host for host in os.environ.get("MEMCACHED_HOSTS", "").split(",") if host
+]
+
+if MEMCACHED_HOSTS:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.memcached.MemcachedCache",
+            "LOCATION": MEMCACHED_HOSTS,
+        }
+    }
+else:
+    CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+
+TOKEN_AUTH_CACHE = {
+    "MAX_SIZE": int(os.environ.get("TOKEN_AUTH_CACHE_SIZE", 10000)),
+    "TTL": int(os.environ.get("TOKEN_AUTH_CACHE_TTL", 60)),
+    "CACHE_ALIAS": os.environ.get(
+        "TOKEN_AUTH_CACHE_ALIAS", "default" if MEMCACHED_HOSTS else None
+    ),
+}
+
+RESPONSE_CACHE = {
+    "CACHE_ALIAS": os.environ.get("RESPONSE_CACHE_ALIAS", "default"),
+    "TIMEOUT": int(os.environ.get("RESPONSE_CACHE_TIMEOUT", 300)),
+}
+
+REST_FRAMEWORK = {
+    "DEFAULT_PAGINATION_CLASS": "recipe.pagination.IdCursorPagination",
+    "PAGE_SIZE": int(os.environ.get("API_PAGE_SIZE", 20)),
+    "DEFAULT_RENDERER_CLASSES": (
+        "core.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "core.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
+}
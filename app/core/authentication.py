@@ -0,0 +1,120 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+
+
+class TokenCache:
+    """Cache of authenticated tokens, shared or in-process
+
+    Entries expire after ttl seconds. When a shared cache alias is given,
+    entries live only in that cache so an invalidation in one process is
+    seen by every other one. Otherwise they are kept in a bounded LRU.
+    """
+
+    def __init__(self, max_size, ttl, alias=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.alias = alias
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _shared_key(self, key):
+        return "auth-token:v2:" + hashlib.sha256(key.encode()).hexdigest()
+
+    def get(self, key):
+        """Returns the cached (user, token) pair for a key or None"""
+        if self.alias is not None:
+            return caches[self.alias].get(self._shared_key(key))
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    return value
+                del self._entries[key]
+
+        return None
+
+    def set(self, key, value):
+        """Caches the (user, token) pair authenticated by a key"""
+        if self.alias is not None:
+            caches[self.alias].set(self._shared_key(key), value, self.ttl)
+        else:
+            self._store(key, value, time.monotonic())
+
+    def _store(self, key, value, now):
+        with self._lock:
+            self._entries[key] = (now + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        """Removes a key from the cache"""
+        if self.alias is not None:
+            caches[self.alias].delete(self._shared_key(key))
+        else:
+            with self._lock:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        """Empties the in-process entries, the shared cache is left alone"""
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache(
+    max_size=settings.TOKEN_AUTH_CACHE["MAX_SIZE"],
+    ttl=settings.TOKEN_AUTH_CACHE["TTL"],
+    alias=settings.TOKEN_AUTH_CACHE["CACHE_ALIAS"],
+)
+
+
+# Kept out of the cache, which may be a shared network store. Reading them
+# from a cached user loads them from the database.
+UNCACHED_FIELDS = ("password",)
+
+
+def _field_values(instance):
+    """Returns the database alias and column values an instance is loaded from"""
+    fields = [
+        field
+        for field in instance._meta.concrete_fields
+        if field.name not in UNCACHED_FIELDS
+    ]
+
+    return (
+        instance._state.db,
+        tuple(field.attname for field in fields),
+        tuple(getattr(instance, field.attname) for field in fields),
+    )
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that caches successful lookups
+
+    Only field values are cached and every request gets its own user and
+    token instances, so concurrent requests never share model state.
+    """
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+
+        if cached is None:
+            user, token = super().authenticate_credentials(key)
+            cached = (_field_values(user), _field_values(token))
+            token_cache.set(key, cached)
+
+        user = get_user_model().from_db(*cached[0])
+        token = self.get_model().from_db(*cached[1])
+        token.user = user
+
+        return user, token
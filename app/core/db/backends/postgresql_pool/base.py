@@ -0,0 +1,89 @@
+import os
+import threading
+
+from django.db.backends.postgresql import base
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+from core.db.pool import ConnectionPool, PoolTimeout
+
+Database = base.Database
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def check_connection(connection):
+    """Returns whether a pooled connection still answers queries"""
+    if connection.closed:
+        return False
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+    if connection.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+        connection.rollback()
+
+    return True
+
+
+def get_pool(alias, settings_dict):
+    """Returns the pool of a database alias for the current process
+
+    Pools are keyed by process id so a forked worker never reuses the
+    sockets of its parent.
+    """
+    key = (alias, os.getpid())
+
+    with _pools_lock:
+        if key not in _pools:
+            options = settings_dict.get("POOL", {})
+            _pools[key] = ConnectionPool(
+                max_size=options.get("MAX_SIZE", 10),
+                idle_timeout=options.get("IDLE_TIMEOUT", 300),
+                timeout=options.get("TIMEOUT", 30),
+                check=check_connection if options.get("CHECK", True) else None,
+            )
+
+        return _pools[key]
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL backend that checks connections out of a process-wide pool
+
+    Closing the connection, as Django does at the end of every request when
+    CONN_MAX_AGE is 0, returns it to the pool instead of disconnecting.
+    """
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.settings_dict)
+
+    def get_new_connection(self, conn_params):
+        try:
+            connection = self.pool.acquire(
+                lambda: super(DatabaseWrapper, self).get_new_connection(conn_params)
+            )
+        except PoolTimeout as exc:
+            raise Database.OperationalError(str(exc))
+
+        options = self.settings_dict["OPTIONS"]
+        self.isolation_level = options.get(
+            "isolation_level", connection.isolation_level
+        )
+
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+
+        connection = self.connection
+        discard = self.errors_occurred or connection.closed
+
+        if not discard:
+            try:
+                if connection.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+            except Database.Error:
+                discard = True
+
+        self.pool.release(connection, discard=discard)
@@ -0,0 +1,143 @@
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    """No connection became available before the checkout timeout"""
+
+
+class ConnectionPool:
+    """Thread-safe pool of raw DB-API connections
+
+    At most max_size connections are open at once. Idle connections are
+    reused most recently released first and closed once they have been idle
+    for idle_timeout seconds. When check is given it is called with each
+    reused connection on checkout and a falsy result, or an exception,
+    discards that connection.
+    """
+
+    def __init__(self, max_size, idle_timeout, timeout=None, check=None):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.check = check
+        self._idle = deque()
+        self._size = 0
+        self._condition = threading.Condition()
+        self._stats = {
+            "created": 0,
+            "reused": 0,
+            "discarded": 0,
+            "expired": 0,
+            "waits": 0,
+            "timeouts": 0,
+        }
+
+    def acquire(self, connect):
+        """Returns a pooled connection, calling connect to open a new one"""
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+
+        while True:
+            connection = self._checkout(deadline)
+            if connection is None:
+                break
+            if self._is_healthy(connection):
+                return connection
+            self._discard(connection, "discarded")
+
+        try:
+            connection = connect()
+        except BaseException:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+        with self._condition:
+            self._stats["created"] += 1
+
+        return connection
+
+    def _checkout(self, deadline):
+        """Returns an idle connection or None once a new one may be opened"""
+        with self._condition:
+            waited = False
+            while True:
+                self._expire(time.monotonic())
+                if self._idle:
+                    self._stats["reused"] += 1
+                    return self._idle.pop()[1]
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None
+
+                if not waited:
+                    self._stats["waits"] += 1
+                    waited = True
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeout(
+                        f"No connection available within {self.timeout} seconds"
+                    )
+                self._condition.wait(remaining)
+
+    def _expire(self, now):
+        while self._idle and now - self._idle[0][0] >= self.idle_timeout:
+            _, connection = self._idle.popleft()
+            self._size -= 1
+            self._stats["expired"] += 1
+            _close_quietly(connection)
+
+    def _is_healthy(self, connection):
+        if self.check is None:
+            return True
+        try:
+            return bool(self.check(connection))
+        except Exception:
+            return False
+
+    def _discard(self, connection, reason):
+        _close_quietly(connection)
+        with self._condition:
+            self._size -= 1
+            self._stats[reason] += 1
+            self._condition.notify()
+
+    def release(self, connection, discard=False):
+        """Returns a connection to the pool, closing it when discard is set"""
+        if discard:
+            self._discard(connection, "discarded")
+            return
+
+        with self._condition:
+            self._idle.append((time.monotonic(), connection))
+            self._condition.notify()
+
+    def close_idle(self):
+        """Closes every idle connection"""
+        with self._condition:
+            idle, self._idle = self._idle, deque()
+            self._size -= len(idle)
+
+        for _, connection in idle:
+            _close_quietly(connection)
+
+    def stats(self):
+        """Returns the current usage counters of the pool"""
+        with self._condition:
+            return dict(
+                self._stats,
+                size=self._size,
+                idle=len(self._idle),
+                in_use=self._size - len(self._idle),
+                max_size=self.max_size,
+            )
+
+
+def _close_quietly(connection):
+    try:
+        connection.close()
+    except Exception:
+        pass
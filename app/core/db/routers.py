@@ -0,0 +1,71 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+_read_alias = ContextVar("read_alias", default=DEFAULT_DB_ALIAS)
+
+
+def use_primary(flag):
+    """Routes reads of the current context to the primary or a replica
+
+    The replica is chosen once so that every read of the context, such as
+    a request, sees the same data. Returns a token for restore().
+    """
+    replicas = settings.DATABASE_REPLICA_ROUTING["REPLICAS"]
+
+    if flag or not replicas:
+        return _read_alias.set(DEFAULT_DB_ALIAS)
+
+    return _read_alias.set(random.choice(replicas))
+
+
+def restore(token):
+    _read_alias.reset(token)
+
+
+@contextmanager
+def pin_primary():
+    """Sends every read inside the block to the primary"""
+    token = use_primary(True)
+    try:
+        yield
+    finally:
+        restore(token)
+
+
+class PrimaryReplicaRouter:
+    """Sends writes to the primary and reads to the context's replica
+
+    Reads only go to replicas where the current context allows it, which
+    ReplicaRoutingMiddleware does for safe requests. Anything running
+    outside a request, such as management commands and background
+    workers, keeps reading from the primary.
+
+    Models in primary_models are always read from the primary. Tokens,
+    sessions and users are, so that credentials are usable as soon as they
+    are created: the request creating them has none to pin the client with.
+    """
+
+    primary_models = (
+        "authtoken.token",
+        "sessions.session",
+        settings.AUTH_USER_MODEL.lower(),
+    )
+
+    def db_for_read(self, model, **hints):
+        if model._meta.label_lower in self.primary_models:
+            return DEFAULT_DB_ALIAS
+
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,163 @@
+import io
+import math
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.util import setup_testing_defaults
+
+from django.contrib.auth import get_user_model
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from rest_framework.authtoken.models import Token
+
+
+def percentile(values, percent):
+    """Returns the nearest-rank percentile of sorted values"""
+    return values[max(math.ceil(percent / 100 * len(values)) - 1, 0)]
+
+
+class Command(BaseCommand):
+    """Measures the per-request latency of an endpoint at several concurrencies
+
+    By default requests go through an in-process WSGI handler, including
+    the connection handling Django does when a request starts and
+    finishes, so running it with and without DB_POOL or DB_CONN_MAX_AGE
+    shows the cost of opening a connection per request. With --url they
+    are sent over HTTP to a running server instead, which shows how
+    throughput scales with its worker processes.
+    """
+
+    help = "Measures the per-request latency of an endpoint"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default="/api/recipe/recipes/")
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, nargs="+", default=[4])
+        parser.add_argument(
+            "--url",
+            help="Base URL of a running server, such as http://localhost:8000.",
+        )
+        parser.add_argument(
+            "--email",
+            help="Authenticate as this existing user instead of a temporary one.",
+        )
+
+    def handle(self, *args, **options):
+        temporary = options["email"] is None
+        if temporary:
+            user = get_user_model().objects.create_user(
+                "loadtest@loadtest.com", "loadtest"
+            )
+        else:
+            user = get_user_model().objects.get(email=options["email"])
+        token, _ = Token.objects.get_or_create(user=user)
+        connections.close_all()
+        self.sent = 0
+
+        if options["url"]:
+            send = self.http_sender(options["url"], options["path"], token.key)
+        else:
+            send = self.wsgi_sender(WSGIHandler(), options["path"], token.key)
+
+        try:
+            for concurrency in options["concurrency"]:
+                self.stdout.write(f"concurrency={concurrency}")
+                self.report(self.run(send, options["requests"], concurrency))
+        finally:
+            if temporary:
+                user.delete()
+
+    def wsgi_sender(self, handler, path, key):
+        """Returns a function sending a numbered request to handler"""
+
+        def send(number):
+            statuses = []
+            environ = {
+                "REQUEST_METHOD": "GET",
+                "PATH_INFO": path,
+                "QUERY_STRING": f"loadtest={number}",
+                "HTTP_AUTHORIZATION": f"Token {key}",
+                "wsgi.input": io.BytesIO(),
+            }
+            setup_testing_defaults(environ)
+
+            response = handler(environ, lambda status, headers: statuses.append(status))
+            try:
+                b"".join(response)
+            finally:
+                response.close()
+
+            return statuses[0].startswith("2")
+
+        return send
+
+    def http_sender(self, url, path, key):
+        """Returns a function sending a numbered request to a running server"""
+
+        def send(number):
+            request = urllib.request.Request(
+                f"{url.rstrip('/')}{path}?loadtest={number}",
+                headers={"Authorization": f"Token {key}"},
+            )
+            try:
+                with urllib.request.urlopen(request) as response:
+                    response.read()
+            except urllib.error.URLError:
+                return False
+
+            return True
+
+        return send
+
+    def run(self, send, requests, concurrency):
+        """Returns the latencies, error count, wall time and connections opened"""
+        opened = []
+
+        def count_connection(sender, connection, **kwargs):
+            opened.append(connection.alias)
+
+        def timed(number):
+            start = time.perf_counter()
+            ok = send(number)
+            return time.perf_counter() - start, not ok
+
+        # Number requests across runs so each one misses the response cache
+        numbers = range(self.sent, self.sent + requests)
+        self.sent += requests
+
+        connection_created.connect(count_connection)
+        start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                results = list(executor.map(timed, numbers))
+        finally:
+            connection_created.disconnect(count_connection)
+        wall = time.perf_counter() - start
+
+        latencies = sorted(latency for latency, _ in results)
+        errors = sum(error for _, error in results)
+
+        return latencies, errors, wall, len(opened)
+
+    def report(self, result):
+        latencies, errors, wall, opened = result
+        ms = [latency * 1000 for latency in latencies]
+
+        self.stdout.write(
+            f"requests={len(ms)} errors={errors} "
+            f"throughput={len(ms) / wall:.1f}/s connections={opened}"
+        )
+        self.stdout.write(
+            f"latency ms mean={sum(ms) / len(ms):.2f} p50={percentile(ms, 50):.2f} "
+            f"p95={percentile(ms, 95):.2f} p99={percentile(ms, 99):.2f}"
+        )
+
+        pool = getattr(connection, "pool", None)
+        if pool is not None:
+            stats = pool.stats()
+            self.stdout.write(
+                "pool " + " ".join(f"{name}={stats[name]}" for name in sorted(stats))
+            )
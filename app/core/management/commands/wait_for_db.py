@@ -1,22 +1,118 @@
 import time
-from django.db import connections
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
 
 class Command(BaseCommand):
     """"Django to pause execution until database is available"""
 
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=60,
+            help="Seconds to wait before giving up.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0.5,
+            help="First delay between attempts, doubled after each failure.",
+        )
+        parser.add_argument(
+            "--max-interval",
+            type=float,
+            default=5,
+            help="Upper bound of the delay between attempts.",
+        )
+        parser.add_argument(
+            "--warm",
+            type=int,
+            default=0,
+            metavar="N",
+            help="Open N connections concurrently once the database is up.",
+        )
+        parser.add_argument(
+            "--check-migrations",
+            action="store_true",
+            help="Also wait until every migration has been applied.",
+        )
+
     def handle(self, *args, **options):
+        self.options = options
+        self.deadline = time.monotonic() + options["timeout"]
+        alias = options["database"]
+
         self.stdout.write("Waiting for database...")
+        self.retry(lambda: self.probe(alias))
+        self.stdout.write(self.style.SUCCESS("Database available"))
 
-        db_conn = None
+        if options["warm"] > 0:
+            self.warm(alias, options["warm"])
 
-        while not db_conn:
+        if options["check_migrations"]:
+            self.stdout.write("Waiting for migrations...")
+            self.retry(lambda: self.check_migrations(alias))
+            self.stdout.write(self.style.SUCCESS("Migrations applied"))
+
+    def retry(self, check):
+        """Calls check until it stops raising OperationalError or time is up"""
+        delay = self.options["interval"]
+
+        while True:
             try:
-                db_conn = connections["default"]
-            except OperationalError:
-                time.sleep(1)
-                self.stdout.write("Database unavailable. Waiting 1 second.")
+                return check()
+            except OperationalError as exc:
+                remaining = self.deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CommandError(f"Database unavailable: {exc}")
 
-        self.stdout.write(self.style.SUCCESS("Database available"))
+                delay = min(delay, remaining)
+                self.stdout.write(f"Database unavailable. Waiting {delay:g} seconds.")
+                time.sleep(delay)
+                delay = min(delay * 2, self.options["max_interval"])
+
+    def probe(self, alias):
+        """Runs SELECT 1 on a connection, closing it when it fails"""
+        connection = connections[alias]
+
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+        except OperationalError:
+            connection.close()
+            raise
+
+    def warm(self, alias, count):
+        """Opens count connections concurrently so the server has them ready"""
+
+        def probe_and_release():
+            try:
+                self.probe(alias)
+            finally:
+                connections[alias].close()
+
+        with ThreadPoolExecutor(max_workers=count) as executor:
+            futures = [executor.submit(probe_and_release) for _ in range(count)]
+            for future in futures:
+                try:
+                    future.result()
+                except OperationalError as exc:
+                    raise CommandError(f"Could not warm connections: {exc}")
+
+        self.stdout.write(self.style.SUCCESS(f"Warmed {count} connections"))
+
+    def check_migrations(self, alias):
+        """Raises OperationalError while some migrations are unapplied"""
+        executor = MigrationExecutor(connections[alias])
+        plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+
+        if plan:
+            names = ", ".join(str(migration) for migration, _ in plan)
+            raise OperationalError(f"Unapplied migrations: {names}")
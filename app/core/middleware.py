@@ -0,0 +1,68 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+
+from core.db import routers
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def _sticky_keys(request, response=None):
+    """Returns the cache keys of the credentials identifying a client
+
+    Clients are identified by their Authorization header or their session
+    cookie, including a session the response starts such as on login.
+    """
+    credentials = [
+        request.META.get("HTTP_AUTHORIZATION"),
+        request.COOKIES.get(settings.SESSION_COOKIE_NAME),
+    ]
+    if response is not None and settings.SESSION_COOKIE_NAME in response.cookies:
+        credentials.append(response.cookies[settings.SESSION_COOKIE_NAME].value)
+
+    return [
+        "replica-sticky:" + hashlib.sha256(credential.encode()).hexdigest()
+        for credential in credentials
+        if credential
+    ]
+
+
+class ReplicaRoutingMiddleware:
+    """Lets safe requests read from replicas unless the client just wrote
+
+    A write pins the client, identified by its Authorization header or its
+    session, to the primary for STICKY_SECONDS so it reads its own writes
+    while the replicas catch up.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        options = settings.DATABASE_REPLICA_ROUTING
+        cache = caches[options["CACHE_ALIAS"]]
+        keys = _sticky_keys(request)
+
+        writes = request.method not in SAFE_METHODS
+
+        if writes:
+            self.stick(cache, keys, options)
+            token = routers.use_primary(True)
+        else:
+            token = routers.use_primary(bool(keys) and bool(cache.get_many(keys)))
+
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.restore(token)
+
+        if writes:
+            # Restart the window so it is counted from the end of the write
+            self.stick(cache, _sticky_keys(request, response), options)
+
+        return response
+
+    def stick(self, cache, keys, options):
+        if keys:
+            cache.set_many(dict.fromkeys(keys, True), options["STICKY_SECONDS"])
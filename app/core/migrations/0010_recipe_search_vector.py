@@ -0,0 +1,66 @@
+# Generated by Django 2.2.28 on 2026-10-18 02:31
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+POSTGRESQL_FORWARDS = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX core_recipe_search_vector_idx "
+    "ON core_recipe USING gin (search_vector)",
+    "CREATE INDEX core_recipe_title_trgm_idx "
+    "ON core_recipe USING gin (title gin_trgm_ops)",
+    """
+    UPDATE core_recipe SET search_vector =
+        setweight(to_tsvector('english', title), 'A')
+        || setweight(to_tsvector('english', coalesce((
+            SELECT string_agg(core_tag.name, ' ')
+            FROM core_tag
+            JOIN core_recipe_tags ON core_recipe_tags.tag_id = core_tag.id
+            WHERE core_recipe_tags.recipe_id = core_recipe.id
+        ), '')), 'B')
+        || setweight(to_tsvector('english', coalesce((
+            SELECT string_agg(core_ingredient.name, ' ')
+            FROM core_ingredient
+            JOIN core_recipe_ingredients
+                ON core_recipe_ingredients.ingredient_id = core_ingredient.id
+            WHERE core_recipe_ingredients.recipe_id = core_recipe.id
+        ), '')), 'C')
+    """,
+)
+
+POSTGRESQL_BACKWARDS = (
+    "DROP INDEX core_recipe_title_trgm_idx",
+    "DROP INDEX core_recipe_search_vector_idx",
+)
+
+
+def run_on_postgresql(statements):
+    """Returns a RunPython function executing statements on PostgreSQL only"""
+
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == "postgresql":
+            for statement in statements:
+                schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0009_recipe_image_status"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(
+            run_on_postgresql(POSTGRESQL_FORWARDS),
+            run_on_postgresql(POSTGRESQL_BACKWARDS),
+        ),
+    ]
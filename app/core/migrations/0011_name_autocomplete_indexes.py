@@ -0,0 +1,48 @@
+from django.db import migrations
+
+TABLES = ("core_tag", "core_ingredient")
+
+# istartswith compiles to UPPER("name"::text) LIKE UPPER(...) || '%'
+POSTGRESQL_FORWARDS = [
+    statement
+    for table in TABLES
+    for statement in (
+        f"CREATE INDEX {table}_user_name_prefix_idx "
+        f"ON {table} (user_id, UPPER(name::text) text_pattern_ops)",
+        f"CREATE INDEX {table}_name_trgm_idx ON {table} USING gin (name gin_trgm_ops)",
+    )
+]
+
+POSTGRESQL_BACKWARDS = [
+    statement
+    for table in TABLES
+    for statement in (
+        f"DROP INDEX {table}_name_trgm_idx",
+        f"DROP INDEX {table}_user_name_prefix_idx",
+    )
+]
+
+
+def run_on_postgresql(statements):
+    """Returns a RunPython function executing statements on PostgreSQL only"""
+
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == "postgresql":
+            for statement in statements:
+                schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0010_recipe_search_vector"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_on_postgresql(POSTGRESQL_FORWARDS),
+            run_on_postgresql(POSTGRESQL_BACKWARDS),
+        ),
+    ]
@@ -0,0 +1,42 @@
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """Moves the recipes of duplicate tags and ingredients to the oldest one"""
+    Recipe = apps.get_model("core", "Recipe")
+
+    for model_name, relation in (("Tag", "tags"), ("Ingredient", "ingredients")):
+        model = apps.get_model("core", model_name)
+        through = Recipe._meta.get_field(relation).remote_field.through
+        column = f"{model_name.lower()}_id"
+        duplicates = (
+            model.objects.values("user_id", "name")
+            .annotate(keep=Min("id"), count=Count("id"))
+            .filter(count__gt=1)
+        )
+
+        for duplicate in duplicates:
+            keep = duplicate["keep"]
+            ids = model.objects.filter(
+                user_id=duplicate["user_id"], name=duplicate["name"]
+            ).exclude(id=keep)
+
+            for pk in ids.values_list("id", flat=True):
+                linked = through.objects.filter(**{column: keep}).values("recipe_id")
+                rows = through.objects.filter(**{column: pk})
+                rows.filter(recipe_id__in=linked).delete()
+                rows.update(**{column: keep})
+
+            ids.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0011_name_autocomplete_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 2.2.28 on 2026-10-18 02:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0012_merge_duplicate_names"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="ingredient",
+            constraint=models.UniqueConstraint(
+                fields=("user", "name"), name="core_ingredient_user_name_uniq"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="tag",
+            constraint=models.UniqueConstraint(
+                fields=("user", "name"), name="core_tag_user_name_uniq"
+            ),
+        ),
+        migrations.RemoveIndex(
+            model_name="ingredient",
+            name="core_ingred_user_id_b96ee8_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="tag",
+            name="core_tag_user_id_74e398_idx",
+        ),
+    ]
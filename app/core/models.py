@@ -1,4 +1,5 @@
 from django.db import models
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
@@ -16,6 +17,12 @@ def recipe_image_file_path(instance, file_name):
     return os.path.join("upload", "recipe", file_name)
 
 
+def recipe_image_variant_path(file_name, variant):
+    """Generate file path of a resized variant next to the recipe image"""
+    stem = os.path.splitext(file_name)[0]
+    return f"{stem}.{variant}.webp"
+
+
 class UserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
         """Creates and saves a new user"""
@@ -59,6 +66,13 @@ class Tag(models.Model):
     name = models.CharField(max_length=255)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "name"], name="core_tag_user_name_uniq"
+            )
+        ]
+
     def __str__(self):
         return self.name
 
@@ -69,6 +83,13 @@ class Ingredient(models.Model):
     name = models.CharField(max_length=255)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "name"], name="core_ingredient_user_name_uniq"
+            )
+        ]
+
     def __str__(self):
         return self.name
 
@@ -76,6 +97,15 @@ class Ingredient(models.Model):
 class Recipe(models.Model):
     """Recipe object"""
 
+    IMAGE_PENDING = "pending"
+    IMAGE_READY = "ready"
+    IMAGE_FAILED = "failed"
+    IMAGE_STATUS_CHOICES = (
+        (IMAGE_PENDING, "Pending"),
+        (IMAGE_READY, "Ready"),
+        (IMAGE_FAILED, "Failed"),
+    )
+
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     title = models.CharField(max_length=255)
     time_minutes = models.IntegerField()
@@ -84,6 +114,14 @@ class Recipe(models.Model):
     ingredients = models.ManyToManyField("Ingredient")
     tags = models.ManyToManyField("Tag")
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image_status = models.CharField(
+        max_length=10, blank=True, choices=IMAGE_STATUS_CHOICES
+    )
+    # Title, tag and ingredient names, kept up to date on PostgreSQL only
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [models.Index(fields=["user", "id"])]
 
     def __str__(self):
         return self.title
@@ -94,5 +132,8 @@ class RecipeBook(models.Model):
     title = models.CharField(max_length=255)
     recipes = models.ManyToManyField("Recipe")
 
+    class Meta:
+        indexes = [models.Index(fields=["user", "id"])]
+
     def __str__(self):
         return self.title
@@ -0,0 +1,143 @@
+import csv
+import io
+import re
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+    ORJSON_ERRORS = (orjson.JSONEncodeError,)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer that encodes with orjson when it is installed
+
+    Produces the same bytes as JSONRenderer, except that NaN renders as
+    null and floats in exponent notation drop the "+". Dates, times and
+    any other type orjson does not encode natively go through DRF's
+    JSONEncoder. Pretty printing, ASCII-only output and anything orjson
+    rejects fall back to JSONRenderer.
+    """
+
+    _encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data, default=self._encoder.default, option=ORJSON_OPTIONS
+            )
+        except ORJSON_ERRORS:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Escape the line separators JSONRenderer escapes for JavaScript
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028")
+            ret = ret.replace(b"\xe2\x80\xa9", b"\\u2029")
+
+        return ret
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Renders a list as one JSON document per line"""
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = None
+    json_renderer = FastJSONRenderer()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        return b"".join(self.render_chunks([_as_rows(data)]))
+
+    def render_chunks(self, chunks, fields=None):
+        """Yields the lines of each chunk of rows as one bytestring"""
+        for chunk in chunks:
+            yield b"".join(self.json_renderer.render(row) + b"\n" for row in chunk)
+
+
+# Cells starting with these are formulas to spreadsheet applications, unless
+# they are plain numbers
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+NUMBER = re.compile(r"[+-]?\d+(\.\d+)?")
+
+
+class CSVRenderer(BaseRenderer):
+    """Renders a list of flat objects as CSV with a header row
+
+    Lists are rendered as comma separated values within their cell. Text
+    that a spreadsheet would run as a formula is prefixed with a quote.
+    """
+
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        return b"".join(self.render_chunks([_as_rows(data)]))
+
+    def render_chunks(self, chunks, fields=None):
+        """Yields the header, then the lines of each chunk of rows"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        if fields is not None:
+            writer.writerow(fields)
+
+        for chunk in chunks:
+            if fields is None:
+                if not chunk:
+                    continue
+                fields = list(chunk[0])
+                writer.writerow(fields)
+            for row in chunk:
+                writer.writerow(self.render_cell(row.get(field)) for field in fields)
+
+            yield self.flush(buffer)
+
+        if buffer.tell():
+            yield self.flush(buffer)
+
+    def render_cell(self, value):
+        if value is None:
+            return ""
+        if isinstance(value, (list, tuple)):
+            value = ",".join(str(item) for item in value)
+        if (
+            isinstance(value, str)
+            and value.startswith(FORMULA_PREFIXES)
+            and not NUMBER.fullmatch(value)
+        ):
+            return "'" + value
+
+        return value
+
+    def flush(self, buffer):
+        data = buffer.getvalue().encode(self.charset)
+        buffer.seek(0)
+        buffer.truncate()
+
+        return data
+
+
+def _as_rows(data):
+    return data if isinstance(data, list) else [data]
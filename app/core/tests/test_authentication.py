@@ -0,0 +1,103 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from core.authentication import CachedTokenAuthentication, TokenCache, token_cache
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user("nilo@gmail.com", "123456")
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def test_authenticate_caches_token_lookup(self):
+        """Test repeated authentication does not hit the database"""
+        self.auth.authenticate_credentials(self.token.key)
+
+        with self.assertNumQueries(0):
+            user, token = self.auth.authenticate_credentials(self.token.key)
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(token, self.token)
+
+    def test_cached_lookups_do_not_share_instances(self):
+        """Test concurrent requests get their own user and token instances"""
+        first, _ = self.auth.authenticate_credentials(self.token.key)
+        second, token = self.auth.authenticate_credentials(self.token.key)
+
+        self.assertIsNot(first, second)
+        self.assertIsNot(first._state, second._state)
+        first._state.fields_cache["cached"] = True
+        self.assertNotIn("cached", second._state.fields_cache)
+        self.assertIs(token.user, second)
+        self.assertEqual(second.email, self.user.email)
+        self.assertFalse(second._state.adding)
+
+    def test_password_hash_is_not_cached(self):
+        self.auth.authenticate_credentials(self.token.key)
+
+        cached = token_cache.get(self.token.key)
+
+        self.assertNotIn("password", cached[0][1])
+        self.assertNotIn(self.user.password, repr(cached))
+        user, _ = self.auth.authenticate_credentials(self.token.key)
+        self.assertTrue(user.check_password("123456"))
+
+    def test_invalid_token_fails(self):
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials("invalid")
+
+    def test_deleted_token_is_invalidated(self):
+        self.auth.authenticate_credentials(self.token.key)
+        self.token.delete()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_deactivated_user_is_invalidated(self):
+        self.auth.authenticate_credentials(self.token.key)
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+
+class TokenCacheTests(TestCase):
+    @patch("time.monotonic")
+    def test_entries_expire_after_ttl(self, monotonic):
+        cache = TokenCache(max_size=10, ttl=60)
+        monotonic.return_value = 100
+        cache.set("key", "value")
+
+        monotonic.return_value = 159
+        self.assertEqual(cache.get("key"), "value")
+
+        monotonic.return_value = 160
+        self.assertIsNone(cache.get("key"))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = TokenCache(max_size=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+
+    def test_shared_cache_is_seen_by_every_process(self):
+        writer = TokenCache(max_size=2, ttl=60, alias="default")
+        reader = TokenCache(max_size=2, ttl=60, alias="default")
+        writer.set("key", "value")
+
+        self.assertEqual(reader.get("key"), "value")
+
+        writer.delete("key")
+        self.assertIsNone(reader.get("key"))
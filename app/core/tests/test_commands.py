@@ -1,25 +1,86 @@
-from unittest.mock import patch
+from io import StringIO
+from unittest.mock import MagicMock, patch
 
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase
 
+CURSOR = "django.db.backends.base.base.BaseDatabaseWrapper.cursor"
+
+
+class CommandTest(SimpleTestCase):
+    databases = {"default"}
 
-class CommandTest(TestCase):
     def test_wait_for_db_ready(self):
         """Test access to db when its available"""
 
-        with patch("django.db.utils.ConnectionHandler.__getitem__") as gi:
-            gi.return_value = True
-            call_command("wait_for_db")
-            self.assertEqual(gi.call_count, 1)
+        with patch(CURSOR) as cursor:
+            call_command("wait_for_db", stdout=StringIO())
+            self.assertEqual(cursor.call_count, 1)
+            cursor().__enter__().execute.assert_called_with("SELECT 1")
 
     @patch("time.sleep", return_value=None)
     def test_wait_for_db(self, ts):
         """Test waiting for db"""
 
-        with patch("django.db.utils.ConnectionHandler.__getitem__") as gi:
-            # raises OE 5 times before returning True
-            gi.side_effect = [OperationalError] * 5 + [True]
-            call_command("wait_for_db")
-            self.assertEqual(gi.call_count, 6)
+        with patch(CURSOR) as cursor:
+            # raises OE 5 times before connecting
+            cursor.side_effect = [OperationalError] * 5 + [MagicMock()]
+            call_command("wait_for_db", stdout=StringIO())
+            self.assertEqual(cursor.call_count, 6)
+
+    @patch("time.sleep", return_value=None)
+    def test_wait_for_db_backs_off(self, ts):
+        """Test the delay doubles up to the maximum interval"""
+
+        with patch(CURSOR) as cursor:
+            cursor.side_effect = [OperationalError] * 4 + [MagicMock()]
+            call_command(
+                "wait_for_db", "--interval=1", "--max-interval=3", stdout=StringIO()
+            )
+
+        self.assertEqual([call[0][0] for call in ts.call_args_list], [1, 2, 3, 3])
+
+    @patch("time.sleep", return_value=None)
+    def test_wait_for_db_times_out(self, ts):
+        """Test giving up once the timeout has passed"""
+
+        with patch(CURSOR, side_effect=OperationalError), patch(
+            "time.monotonic", side_effect=[0, 1, 2, 11]
+        ):
+            with self.assertRaises(CommandError):
+                call_command("wait_for_db", "--timeout=10", stdout=StringIO())
+
+    def test_wait_for_db_warms_connections(self):
+        """Test opening the requested number of connections"""
+
+        with patch(CURSOR) as cursor:
+            call_command("wait_for_db", "--warm=4", stdout=StringIO())
+            self.assertEqual(cursor.call_count, 5)
+
+
+class MigrationCheckTest(TestCase):
+    def test_wait_for_db_checks_migrations(self):
+        """Test succeeding when every migration is applied"""
+        out = StringIO()
+
+        call_command("wait_for_db", "--check-migrations", stdout=out)
+
+        self.assertIn("Migrations applied", out.getvalue())
+
+    @patch("time.sleep", return_value=None)
+    def test_wait_for_db_waits_for_migrations(self, ts):
+        """Test failing while migrations are unapplied"""
+
+        with patch(
+            "django.db.migrations.executor.MigrationExecutor.migration_plan",
+            return_value=[("core.0001_initial", False)],
+        ):
+            with self.assertRaises(CommandError):
+                call_command(
+                    "wait_for_db",
+                    "--check-migrations",
+                    "--timeout=0",
+                    stdout=StringIO(),
+                )
@@ -1,3 +1,4 @@
+from django.db import connection
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from core import models
@@ -83,3 +84,17 @@ class ModelTests(TestCase):
         expect_path = f"upload/recipe/{uuid}.jpg"
 
         self.assertEqual(expect_path, file_path)
+
+    def test_through_tables_have_reverse_indexes(self):
+        """Test the m2m through tables can be searched from the related side"""
+        expected = {
+            "core_recipe_tags": ["tag_id", "recipe_id"],
+            "core_recipe_ingredients": ["ingredient_id", "recipe_id"],
+            "core_recipebook_recipes": ["recipe_id", "recipebook_id"],
+        }
+
+        with connection.cursor() as cursor:
+            for table, columns in expected.items():
+                constraints = connection.introspection.get_constraints(cursor, table)
+                indexed = [c["columns"] for c in constraints.values() if c["index"]]
+                self.assertIn(columns, indexed)
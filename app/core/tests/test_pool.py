@@ -0,0 +1,108 @@
+import threading
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from core.db.pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def setUp(self):
+        self.pool = ConnectionPool(max_size=2, idle_timeout=10, timeout=0)
+
+    def test_released_connection_is_reused(self):
+        """Test a released connection is handed out again"""
+        connection = self.pool.acquire(FakeConnection)
+        self.pool.release(connection)
+
+        self.assertIs(self.pool.acquire(FakeConnection), connection)
+        stats = self.pool.stats()
+        self.assertEqual(stats["created"], 1)
+        self.assertEqual(stats["reused"], 1)
+        self.assertEqual(stats["in_use"], 1)
+
+    def test_pool_is_bounded(self):
+        """Test checkout times out once max_size connections are in use"""
+        self.pool.acquire(FakeConnection)
+        self.pool.acquire(FakeConnection)
+
+        with self.assertRaises(PoolTimeout):
+            self.pool.acquire(FakeConnection)
+        self.assertEqual(self.pool.stats()["timeouts"], 1)
+
+    def test_waiting_checkout_gets_released_connection(self):
+        """Test a checkout waits for a connection to be released"""
+        pool = ConnectionPool(max_size=1, idle_timeout=10, timeout=5)
+        connection = pool.acquire(FakeConnection)
+        timer = threading.Timer(0.05, pool.release, [connection])
+        timer.start()
+
+        self.assertIs(pool.acquire(FakeConnection), connection)
+        timer.join()
+        self.assertEqual(pool.stats()["waits"], 1)
+
+    def test_idle_connection_expires(self):
+        """Test connections idle for longer than idle_timeout are closed"""
+        with patch("core.db.pool.time.monotonic", return_value=100):
+            connection = self.pool.acquire(FakeConnection)
+            self.pool.release(connection)
+
+        with patch("core.db.pool.time.monotonic", return_value=111):
+            new_connection = self.pool.acquire(FakeConnection)
+
+        self.assertIsNot(new_connection, connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(self.pool.stats()["expired"], 1)
+
+    def test_unhealthy_connection_is_discarded(self):
+        """Test a connection failing the checkout check is replaced"""
+        pool = ConnectionPool(
+            max_size=1, idle_timeout=10, check=lambda connection: False
+        )
+        connection = pool.acquire(FakeConnection)
+        pool.release(connection)
+
+        new_connection = pool.acquire(FakeConnection)
+
+        self.assertIsNot(new_connection, connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.stats()["discarded"], 1)
+        self.assertEqual(pool.stats()["size"], 1)
+
+    def test_failed_connect_frees_slot(self):
+        """Test a connection error does not leak a pool slot"""
+
+        def fail():
+            raise OSError("refused")
+
+        with self.assertRaises(OSError):
+            self.pool.acquire(fail)
+
+        self.assertEqual(self.pool.stats()["size"], 0)
+
+    def test_discarded_release_closes_connection(self):
+        """Test releasing with discard closes the connection"""
+        connection = self.pool.acquire(FakeConnection)
+
+        self.pool.release(connection, discard=True)
+
+        self.assertTrue(connection.closed)
+        self.assertEqual(self.pool.stats()["size"], 0)
+
+    def test_close_idle(self):
+        """Test idle connections are closed on demand"""
+        connection = self.pool.acquire(FakeConnection)
+        self.pool.release(connection)
+
+        self.pool.close_idle()
+
+        self.assertTrue(connection.closed)
+        self.assertEqual(self.pool.stats()["idle"], 0)
@@ -0,0 +1,111 @@
+import datetime
+import io
+from decimal import Decimal
+from unittest import skipIf
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import FastJSONParser
+from core.renderers import CSVRenderer, FastJSONRenderer, orjson
+
+PAYLOAD = {
+    "id": 1,
+    "title": "Café crème ",
+    "price": Decimal("5.50"),
+    "ratio": 0.1,
+    "created": datetime.datetime(2020, 5, 1, 12, 30, 15, 123456),
+    "day": datetime.date(2020, 5, 1),
+    "tags": [1, 2, 3],
+    "link": None,
+    "nested": {1: True, "a": [False, {"b": ""}]},
+}
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    def assert_same_render(self, data, *args):
+        self.assertEqual(
+            FastJSONRenderer().render(data, *args), JSONRenderer().render(data, *args)
+        )
+
+    def test_renders_the_same_bytes(self):
+        """Test the fast renderer matches the stdlib renderer byte for byte"""
+        self.assert_same_render(PAYLOAD)
+        self.assert_same_render([PAYLOAD, PAYLOAD])
+        self.assert_same_render({})
+        self.assert_same_render(None)
+
+    def test_indented_render_falls_back(self):
+        self.assert_same_render(PAYLOAD, "application/json; indent=4")
+
+    def test_renders_without_orjson(self):
+        with patch("core.renderers.orjson", None):
+            self.assert_same_render(PAYLOAD)
+
+    @skipIf(orjson is None, "orjson is not installed")
+    def test_uses_orjson(self):
+        with patch.object(orjson, "dumps", wraps=orjson.dumps) as dumps:
+            FastJSONRenderer().render(PAYLOAD)
+
+        dumps.assert_called_once()
+
+    def test_unsupported_data_falls_back(self):
+        """Test values orjson cannot encode are rendered by the stdlib"""
+        self.assert_same_render({"big": 2**70, "set": ["a"]})
+
+
+class FastJSONParserTests(SimpleTestCase):
+    def parse(self, parser, body):
+        return parser.parse(io.BytesIO(body), "application/json")
+
+    def test_parses_the_same_data(self):
+        body = JSONRenderer().render(PAYLOAD)
+
+        self.assertEqual(
+            self.parse(FastJSONParser(), body), self.parse(JSONParser(), body)
+        )
+
+    def test_parses_big_integers(self):
+        self.assertEqual(
+            self.parse(FastJSONParser(), b"[123456789012345678901234]"),
+            [123456789012345678901234],
+        )
+
+    def test_invalid_json_raises_the_same_error(self):
+        for body in (b"{", b"[NaN]", b"\xff"):
+            with self.assertRaises(ParseError) as expected:
+                self.parse(JSONParser(), body)
+            with self.assertRaises(ParseError) as fast:
+                self.parse(FastJSONParser(), body)
+
+            self.assertEqual(str(fast.exception), str(expected.exception))
+
+    def test_parses_without_orjson(self):
+        with patch("core.parsers.orjson", None):
+            self.assertEqual(self.parse(FastJSONParser(), b'{"a": [1]}'), {"a": [1]})
+
+
+class CSVRendererTests(SimpleTestCase):
+    def test_formulas_are_escaped(self):
+        """Test text a spreadsheet would run as a formula is quoted"""
+        titles = ('=HYPERLINK("http://x")', "+A1", "-1+1", "@SUM(A1)", "\tx")
+        data = [{"title": title, "price": "1.00"} for title in titles]
+        data.append({"title": "Cake", "price": "-2.00"})
+
+        rendered = CSVRenderer().render(data).decode()
+
+        self.assertEqual(
+            rendered.splitlines(),
+            [
+                "title,price",
+                '"\'=HYPERLINK(""http://x"")",1.00',
+                "'+A1,1.00",
+                "'-1+1,1.00",
+                "'@SUM(A1),1.00",
+                "'\tx,1.00",
+                "Cake,-2.00",
+            ],
+        )
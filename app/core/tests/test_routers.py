@@ -0,0 +1,150 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from rest_framework.authtoken.models import Token
+
+from core.db import routers
+from core.middleware import ReplicaRoutingMiddleware
+from core.models import Recipe
+
+REPLICA_ROUTING = {
+    "REPLICAS": ["replica_0"],
+    "STICKY_SECONDS": 5,
+    "CACHE_ALIAS": "default",
+}
+
+
+@override_settings(DATABASE_REPLICA_ROUTING=REPLICA_ROUTING)
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = routers.PrimaryReplicaRouter()
+
+    def test_reads_use_primary_by_default(self):
+        """Test reads outside a request go to the primary"""
+        self.assertEqual(self.router.db_for_read(Recipe), "default")
+
+    def test_reads_use_replica_when_allowed(self):
+        """Test reads go to a replica once the context allows it"""
+        token = routers.use_primary(False)
+        try:
+            self.assertEqual(self.router.db_for_read(Recipe), "replica_0")
+            with routers.pin_primary():
+                self.assertEqual(self.router.db_for_read(Recipe), "default")
+        finally:
+            routers.restore(token)
+
+    @override_settings(
+        DATABASE_REPLICA_ROUTING=dict(REPLICA_ROUTING, REPLICAS=["r0", "r1", "r2"])
+    )
+    def test_reads_use_one_replica_per_context(self):
+        """Test every read of a request goes to the same replica"""
+        token = routers.use_primary(False)
+        try:
+            aliases = {self.router.db_for_read(Recipe) for _ in range(20)}
+        finally:
+            routers.restore(token)
+
+        self.assertEqual(len(aliases), 1)
+
+    def test_token_reads_use_primary(self):
+        """Test new tokens are found before the replicas catch up"""
+        token = routers.use_primary(False)
+        try:
+            self.assertEqual(self.router.db_for_read(Token), "default")
+        finally:
+            routers.restore(token)
+
+    @override_settings(DATABASE_REPLICA_ROUTING=dict(REPLICA_ROUTING, REPLICAS=[]))
+    def test_reads_use_primary_without_replicas(self):
+        """Test reads stay on the primary when no replica is configured"""
+        token = routers.use_primary(False)
+        try:
+            self.assertEqual(self.router.db_for_read(Recipe), "default")
+        finally:
+            routers.restore(token)
+
+    def test_writes_and_migrations_use_primary(self):
+        """Test writes and migrations only target the primary"""
+        token = routers.use_primary(False)
+        try:
+            self.assertEqual(self.router.db_for_write(Recipe), "default")
+        finally:
+            routers.restore(token)
+        self.assertTrue(self.router.allow_migrate("default", "core"))
+        self.assertFalse(self.router.allow_migrate("replica_0", "core"))
+
+
+@override_settings(DATABASE_REPLICA_ROUTING=REPLICA_ROUTING)
+class ReplicaRoutingMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.router = routers.PrimaryReplicaRouter()
+        self.middleware = ReplicaRoutingMiddleware(self.get_response)
+
+    def get_response(self, request):
+        self.read_alias = self.router.db_for_read(Recipe)
+        return HttpResponse()
+
+    def send(self, method, authorization="Token abc", session=None):
+        request = getattr(self.factory, method)("/", HTTP_AUTHORIZATION=authorization)
+        if session is not None:
+            request.COOKIES[settings.SESSION_COOKIE_NAME] = session
+        self.middleware(request)
+        return self.read_alias
+
+    def test_safe_request_reads_from_replica(self):
+        """Test GET requests read from a replica"""
+        self.assertEqual(self.send("get"), "replica_0")
+        self.assertEqual(self.router.db_for_read(Recipe), "default")
+
+    def test_write_request_reads_from_primary(self):
+        """Test writes read from the primary"""
+        self.assertEqual(self.send("post"), "default")
+
+    def test_reads_stick_to_primary_after_write(self):
+        """Test a client reads from the primary right after writing"""
+        self.send("patch")
+
+        self.assertEqual(self.send("get"), "default")
+        self.assertEqual(self.send("get", "Token other"), "replica_0")
+
+    def test_session_reads_stick_to_primary_after_write(self):
+        """Test session clients such as the admin read their own writes"""
+        self.send("post", authorization="", session="abc")
+
+        self.assertEqual(self.send("get", authorization="", session="abc"), "default")
+        self.assertEqual(
+            self.send("get", authorization="", session="other"), "replica_0"
+        )
+
+    def test_new_session_sticks_to_primary(self):
+        """Test the session started by a login reads from the primary"""
+
+        def login(request):
+            response = HttpResponse()
+            response.set_cookie(settings.SESSION_COOKIE_NAME, "new")
+            return response
+
+        ReplicaRoutingMiddleware(login)(self.factory.post("/admin/login/"))
+
+        self.assertEqual(self.send("get", authorization="", session="new"), "default")
+
+    def test_credentials_read_from_primary(self):
+        """Test sessions and users are read from the primary"""
+        token = routers.use_primary(False)
+        try:
+            self.assertEqual(self.router.db_for_read(Session), "default")
+            self.assertEqual(self.router.db_for_read(get_user_model()), "default")
+        finally:
+            routers.restore(token)
+
+    @override_settings(DATABASE_REPLICA_ROUTING=dict(REPLICA_ROUTING, STICKY_SECONDS=0))
+    def test_sticky_window_expires(self):
+        """Test reads go back to replicas once the window is over"""
+        self.send("delete")
+
+        self.assertEqual(self.send("get"), "replica_0")
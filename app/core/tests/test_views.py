@@ -0,0 +1,56 @@
+from unittest.mock import patch
+
+from django.db.utils import OperationalError
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.views import ReadinessView
+
+HEALTH_URL = reverse("health")
+READY_URL = reverse("ready")
+
+
+class HealthViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_health(self):
+        """Test the health check answers without authentication"""
+        res = self.client.get(HEALTH_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {"status": "ok"})
+
+    def test_ready(self):
+        """Test readiness when the database is up and migrated"""
+        res = self.client.get(READY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["checks"], {"default": "ok", "migrations": "ok"})
+
+    def test_not_ready_when_database_fails(self):
+        """Test readiness fails when the database does not answer"""
+        with patch.object(
+            ReadinessView, "check_database", return_value="connection refused"
+        ):
+            res = self.client.get(READY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res.data["status"], "unavailable")
+
+    @patch.object(ReadinessView, "migrations_applied", False)
+    def test_not_ready_with_unapplied_migrations(self):
+        """Test readiness fails while migrations are unapplied"""
+        with patch(
+            "django.db.migrations.executor.MigrationExecutor.migration_plan",
+            side_effect=[[("core.0001_initial", False)], OperationalError("down")],
+        ):
+            res = self.client.get(READY_URL)
+            self.assertEqual(res.data["checks"]["migrations"], "1 unapplied migrations")
+
+            res = self.client.get(READY_URL)
+            self.assertEqual(res.data["checks"]["migrations"], "down")
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
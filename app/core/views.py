@@ -0,0 +1,69 @@
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+from django.db.utils import DatabaseError
+from rest_framework import status
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+
+class HealthView(APIView):
+    """Report that the process is up without touching the database"""
+
+    authentication_classes = ()
+    permission_classes = (AllowAny,)
+
+    def get(self, request):
+        return Response({"status": "ok"})
+
+
+class ReadinessView(APIView):
+    """Report whether the process can serve requests
+
+    Every configured database must answer SELECT 1 and the primary must
+    have every migration applied. Once they have been, the migration check
+    is skipped for the rest of the process.
+    """
+
+    authentication_classes = ()
+    permission_classes = (AllowAny,)
+    migrations_applied = False
+
+    def get(self, request):
+        checks = {alias: self.check_database(alias) for alias in connections}
+        checks["migrations"] = self.check_migrations()
+
+        ready = all(value == "ok" for value in checks.values())
+        data = {"status": "ok" if ready else "unavailable", "checks": checks}
+
+        pool = getattr(connections[DEFAULT_DB_ALIAS], "pool", None)
+        if pool is not None:
+            data["pool"] = pool.stats()
+
+        return Response(
+            data,
+            status=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
+
+    def check_database(self, alias):
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+        except DatabaseError as exc:
+            return str(exc)
+
+        return "ok"
+
+    def check_migrations(self):
+        if not ReadinessView.migrations_applied:
+            try:
+                executor = MigrationExecutor(connections[DEFAULT_DB_ALIAS])
+                plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+            except DatabaseError as exc:
+                return str(exc)
+            if plan:
+                return f"{len(plan)} unapplied migrations"
+            ReadinessView.migrations_applied = True
+
+        return "ok"
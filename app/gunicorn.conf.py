@@ -0,0 +1,53 @@
+"""
+Gunicorn configuration for serving app.wsgi in production.
+
+Start it from this directory with ``gunicorn app.wsgi``. The application is
+loaded once in the master and forked into the workers. Because of that,
+SIGHUP respawns the workers gracefully with the new configuration but keeps
+the preloaded code. To deploy new code without dropping requests, send
+SIGUSR2 to start a new master, then SIGTERM to the old one.
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+if os.environ.get("MEMCACHED_HOSTS"):
+    workers = int(
+        os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1)
+    )
+else:
+    # Caches are local to the process, see CACHES in app/settings.py
+    workers = 1
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+worker_class = "gthread" if threads > 1 else "sync"
+preload_app = True
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 10000))
+max_requests_jitter = max_requests // 10
+
+accesslog = "-"
+errorlog = "-"
+
+
+def pre_fork(server, worker):
+    # Workers must not share the sockets opened while preloading
+    from django.db import connections
+
+    for connection in connections.all():
+        connection.close()
+        pool = getattr(connection, "pool", None)
+        if pool is not None:
+            pool.close_idle()
+
+
+def post_worker_init(worker):
+    # Fill the worker's connection pool so its first requests are not cold
+    from django.conf import settings
+    from django.core.management import call_command
+
+    if settings.DB_POOL:
+        call_command("wait_for_db", warm=threads, timeout=timeout)
@@ -0,0 +1,75 @@
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+def _cache():
+    return caches[settings.RESPONSE_CACHE["CACHE_ALIAS"]]
+
+
+def _state_key(user_id):
+    return f"response-cache:state:{user_id}"
+
+
+def invalidate_user(user_id):
+    """Starts a new version of a user's cached responses and returns it
+
+    Last-Modified only has a one second precision, so the timestamp of the
+    new version is moved past the previous one for If-Modified-Since to
+    never match responses from before the change.
+    """
+    previous = _cache().get(_state_key(user_id))
+    last_modified = int(time.time())
+    if previous is not None:
+        last_modified = max(last_modified, previous[1] + 1)
+
+    state = (uuid.uuid4().hex, last_modified)
+    _cache().set(_state_key(user_id), state, None)
+
+    return state
+
+
+def schedule_invalidation(user_id):
+    """Invalidates a user's responses now and again once the transaction commits
+
+    The second invalidation stops a response read before the commit from
+    being cached under the version started by the first one.
+    """
+    invalidate_user(user_id)
+    transaction.on_commit(lambda: invalidate_user(user_id))
+
+
+def get_user_state(user_id):
+    """Returns the (version, last modified timestamp) of a user's responses"""
+    state = _cache().get(_state_key(user_id))
+
+    if state is None:
+        state = invalidate_user(user_id)
+
+    return state
+
+
+def response_key(request, version):
+    """Returns the cache key of a response for the current representation"""
+    parts = (
+        str(request.user.pk),
+        version,
+        request.accepted_renderer.format,
+        request.build_absolute_uri(),
+    )
+
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+
+def get_response(key):
+    return _cache().get(f"response-cache:response:{key}")
+
+
+def set_response(key, data):
+    _cache().set(
+        f"response-cache:response:{key}", data, settings.RESPONSE_CACHE["TIMEOUT"]
+    )
@@ -0,0 +1,86 @@
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+
+class UserPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key field limited to objects owned by the requesting user"""
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {"child_relation": cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+
+        return BatchedManyRelatedField(**list_kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = self.context.get("request")
+
+        if request is None:
+            return queryset.none()
+
+        return queryset.filter(user=request.user)
+
+
+class BatchedManyRelatedField(serializers.ManyRelatedField):
+    """Resolves every submitted primary key with a single query"""
+
+    preloaded = None
+
+    def to_pks(self, data):
+        """Returns the submitted primary keys and an error per invalid item"""
+        child = self.child_relation
+        pks = []
+        errors = []
+
+        for item in data:
+            try:
+                if child.pk_field is not None:
+                    pks.append(child.pk_field.to_internal_value(item))
+                else:
+                    pks.append(int(item))
+            except (TypeError, ValueError):
+                errors.append(
+                    child.error_messages["incorrect_type"].format(
+                        data_type=type(item).__name__
+                    )
+                )
+
+        return pks, errors
+
+    def preload(self, values):
+        """Resolves the primary keys submitted by many items at once"""
+        pks = set()
+        for data in values:
+            if isinstance(data, list):
+                pks.update(self.to_pks(data)[0])
+
+        self.preloaded = self.child_relation.get_queryset().in_bulk(pks)
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, "__iter__"):
+            self.fail("not_a_list", input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail("empty")
+
+        pks, errors = self.to_pks(data)
+
+        if self.preloaded is not None:
+            objects = self.preloaded
+        else:
+            objects = self.child_relation.get_queryset().in_bulk(pks) if pks else {}
+
+        for pk in pks:
+            if pk not in objects:
+                errors.append(
+                    self.child_relation.error_messages["does_not_exist"].format(
+                        pk_value=pk
+                    )
+                )
+
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        return [objects[pk] for pk in dict.fromkeys(pks)]
@@ -0,0 +1,61 @@
+from django.db.models import Count, Exists, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+MATCH_ANY = "any"
+MATCH_ALL = "all"
+MATCH_MODES = (MATCH_ANY, MATCH_ALL)
+
+
+def filter_by_related(queryset, relation, ids, match=MATCH_ANY):
+    """Filters objects related to any or all of the ids without row fan-out
+
+    "any" is an EXISTS semi-join on the through table and "all" a semi-join
+    on the through rows grouped by object having every requested id.
+    """
+    field = queryset.model._meta.get_field(relation)
+    source = field.m2m_field_name() + "_id"
+    target = field.m2m_reverse_field_name() + "_id"
+    rows = field.remote_field.through.objects.filter(**{f"{target}__in": ids})
+
+    if match == MATCH_ALL:
+        matching = (
+            rows.values(source)
+            .annotate(matched=Count(target))
+            .filter(matched=len(set(ids)))
+            .values(source)
+        )
+        return queryset.filter(pk__in=matching)
+
+    annotation = f"has_{relation}"
+    related = Exists(rows.filter(**{source: OuterRef("pk")}))
+
+    return queryset.annotate(**{annotation: related}).filter(**{annotation: True})
+
+
+def _reverse_rows(queryset, relation):
+    """Returns the through rows of each object of a reverse many to many relation"""
+    field = queryset.model._meta.get_field(relation).field
+    target = field.m2m_reverse_field_name() + "_id"
+    rows = field.remote_field.through.objects.filter(**{target: OuterRef("pk")})
+
+    return rows, target
+
+
+def filter_assigned(queryset, relation):
+    """Filters objects related to anything with an EXISTS semi-join
+
+    relation is a reverse many to many relation, such as "recipe" of tags.
+    """
+    rows, _ = _reverse_rows(queryset, relation)
+
+    return queryset.annotate(assigned=Exists(rows)).filter(assigned=True)
+
+
+def annotate_usage_count(queryset, relation):
+    """Annotates usage_count with the number of objects each one is related to"""
+    rows, target = _reverse_rows(queryset, relation)
+    count = rows.values(target).annotate(count=Count("*")).values("count")
+
+    return queryset.annotate(
+        usage_count=Coalesce(Subquery(count, output_field=IntegerField()), 0)
+    )
@@ -0,0 +1,127 @@
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+from core.models import Recipe, recipe_image_file_path, recipe_image_variant_path
+from recipe import cache
+
+VARIANTS = {
+    "thumbnail": (150, 150),
+    "medium": (600, 600),
+}
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.RECIPE_IMAGE_WORKERS, thread_name_prefix="recipe-image"
+)
+
+
+def variant_urls(image_name):
+    """Returns the storage URL of every variant of a recipe image"""
+    return {
+        variant: default_storage.url(recipe_image_variant_path(image_name, variant))
+        for variant in VARIANTS
+    }
+
+
+def schedule_variants(recipe):
+    """Queues the recipe image for processing once the upload is committed"""
+    transaction.on_commit(
+        lambda: _executor.submit(_run_in_worker, recipe.pk, recipe.image.name)
+    )
+
+
+def delete_image(image_name):
+    """Deletes a recipe image and its variants from the storage"""
+    for name in [image_name] + [
+        recipe_image_variant_path(image_name, variant) for variant in VARIANTS
+    ]:
+        default_storage.delete(name)
+
+
+def schedule_delete(image_name):
+    """Deletes a replaced recipe image once the new one is committed"""
+    transaction.on_commit(lambda: delete_image(image_name))
+
+
+def _run_in_worker(recipe_id, image_name):
+    try:
+        process_recipe_image(recipe_id, image_name)
+    except Exception:
+        logger.exception("Could not process the image of recipe %s", recipe_id)
+    finally:
+        connection.close()
+
+
+def _replace(name, content):
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    default_storage.save(name, ContentFile(content))
+
+
+def _encode(image, image_format, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, **options)
+    return buffer.getvalue()
+
+
+def process_recipe_image(recipe_id, image_name):
+    """Writes the resized WebP variants of a recipe image and strips its EXIF
+
+    Images are served as immutable, so an image with EXIF data is replaced
+    by a stripped copy saved under a new name.
+    """
+    name = image_name
+
+    try:
+        with default_storage.open(image_name) as image_file:
+            image = Image.open(image_file)
+            image_format = image.format
+            has_exif = "exif" in image.info
+            image = ImageOps.exif_transpose(image)
+            image.load()
+
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+
+        if has_exif:
+            original = image if image_format != "JPEG" else image.convert("RGB")
+            name = default_storage.save(
+                recipe_image_file_path(None, image_name),
+                ContentFile(_encode(original, image_format, quality=95)),
+            )
+
+        for variant, size in VARIANTS.items():
+            resized = image.copy()
+            resized.thumbnail(size, Image.LANCZOS)
+            _replace(
+                recipe_image_variant_path(name, variant),
+                _encode(resized, "WEBP", quality=80),
+            )
+
+        image_status = Recipe.IMAGE_READY
+    except Exception:
+        logger.exception("Could not process recipe image %s", image_name)
+        image_status = Recipe.IMAGE_FAILED
+
+    recipes = Recipe.objects.filter(pk=recipe_id, image=image_name)
+    user_ids = list(recipes.values_list("user_id", flat=True))
+    updated = recipes.update(image=name, image_status=image_status)
+
+    # Drop the files of an image replaced meanwhile or by its stripped copy
+    if not updated:
+        delete_image(name)
+    elif name != image_name:
+        delete_image(image_name)
+
+    for user_id in user_ids:
+        cache.invalidate_user(user_id)
+
+    return image_status
@@ -0,0 +1,569 @@
+import io
+import json
+import re
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Prefetch
+from django.test.utils import CaptureQueriesContext
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.management.commands.loadtest import percentile
+from core.models import Tag, Ingredient, Recipe, RecipeBook
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+from recipe import search, serializers, views
+from recipe.filters import MATCH_ALL, MATCH_ANY, filter_assigned, filter_by_related
+from recipe.readers import ListReader
+
+SCENARIOS = {}
+
+
+def scenario(name):
+    """Registers a benchmark scenario under the given name"""
+
+    def register(func):
+        SCENARIOS[name] = func
+        return func
+
+    return register
+
+
+class _Rollback(Exception):
+    pass
+
+
+def seed_user():
+    return get_user_model().objects.create_user("benchmark@benchmark.com", "bench")
+
+
+def seed_recipes(user, count, tags_per_recipe=2, ingredients_per_recipe=3):
+    """Creates count recipes sharing a small pool of tags and ingredients"""
+    Tag.objects.bulk_create(
+        [Tag(user=user, name=f"Tag {i}") for i in range(tags_per_recipe)]
+    )
+    Ingredient.objects.bulk_create(
+        [
+            Ingredient(user=user, name=f"Ingredient {i}")
+            for i in range(ingredients_per_recipe)
+        ]
+    )
+    Recipe.objects.bulk_create(
+        [
+            Recipe(user=user, title=f"Recipe {i}", time_minutes=10, price=5)
+            for i in range(count)
+        ]
+    )
+    recipes = list(Recipe.objects.filter(user=user).order_by("id")[:count])
+    tags = list(Tag.objects.filter(user=user))
+    ingredients = list(Ingredient.objects.filter(user=user))
+
+    Recipe.tags.through.objects.bulk_create(
+        [
+            Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id)
+            for recipe in recipes
+            for tag in tags
+        ]
+    )
+    Recipe.ingredients.through.objects.bulk_create(
+        [
+            Recipe.ingredients.through(recipe_id=recipe.id, ingredient_id=ing.id)
+            for recipe in recipes
+            for ing in ingredients
+        ]
+    )
+
+    return recipes
+
+
+def measure(view, request, repeat, **kwargs):
+    """Returns the query count and best wall time of rendering a view"""
+    best = None
+    queries = 0
+
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            response = view(request, **kwargs)
+            response.render()
+            elapsed = time.perf_counter() - start
+
+        if response.status_code != 200:
+            raise CommandError(f"Unexpected status {response.status_code}")
+
+        queries = len(ctx.captured_queries)
+        best = elapsed if best is None else min(best, elapsed)
+
+    return queries, best
+
+
+class _UncachedRecipeBookViewSet(views.RecipeBookViewSet):
+    def cached_response(self, handler, request, *args, **kwargs):
+        return handler(request, *args, **kwargs)
+
+
+class _UnplannedRecipeBookViewSet(_UncachedRecipeBookViewSet):
+    prefetch_plans = {}
+
+
+@scenario("recipebook_detail")
+def recipebook_detail(command, sizes, repeat):
+    """Retrieve a recipe book with and without the prefetch plan"""
+    factory = APIRequestFactory()
+    planned = _UncachedRecipeBookViewSet.as_view({"get": "retrieve"})
+    unplanned = _UnplannedRecipeBookViewSet.as_view({"get": "retrieve"})
+
+    command.stdout.write("recipes  plan  queries  seconds")
+
+    for size in sizes:
+        user = seed_user()
+        book = RecipeBook.objects.create(user=user, title="Benchmark")
+        book.recipes.add(*seed_recipes(user, size))
+
+        request = factory.get(f"/api/recipe/recipebooks/{book.id}/")
+        force_authenticate(request, user=user)
+
+        for label, view in (("no", unplanned), ("yes", planned)):
+            queries, seconds = measure(view, request, repeat, pk=book.id)
+            command.stdout.write(f"{size:>7}  {label:>4}  {queries:>7}  {seconds:.4f}")
+
+        user.delete()
+
+
+FULL_SCAN = re.compile(r"Seq Scan on core_\w+|\bSCAN (TABLE )?core_\w+$", re.MULTILINE)
+
+
+def list_queryset(viewset, user, params=None):
+    """Returns the page query a viewset's list action runs for a user"""
+    request = Request(APIRequestFactory().get("/", params))
+    request.user = user
+    view = viewset(request=request, action="list", format_kwarg=None, kwargs={})
+    paginator = view.paginator
+    ordering = paginator.ordering
+    if isinstance(ordering, str):
+        ordering = (ordering,)
+
+    queryset = view.filter_queryset(view.get_queryset())
+    if ordering:
+        queryset = queryset.order_by(*ordering)
+
+    return queryset[: paginator.page_size + 1]
+
+
+def seed_users(rows, rows_per_user=1000):
+    """Spreads rows across users so that filtering by user is selective"""
+    count = max(1, rows // rows_per_user)
+    get_user_model().objects.bulk_create(
+        [get_user_model()(email=f"bench{i}@benchmark.com") for i in range(count)]
+    )
+
+    return list(get_user_model().objects.filter(email__startswith="bench"))
+
+
+@scenario("explain_indexes")
+def explain_indexes(command, sizes, repeat):
+    """Check the list endpoint queries are planned as index scans"""
+    failures = 0
+
+    for size in sizes:
+        users = seed_users(size)
+        for user in users:
+            seed_recipes(user, max(1, size // len(users)))
+
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+        user = users[len(users) // 2]
+        tag_ids = ",".join(str(pk) for pk in user.tag_set.values_list("id", flat=True))
+        queries = (
+            ("recipes", list_queryset(views.RecipeViewSet, user)),
+            (
+                "recipes?tags",
+                list_queryset(views.RecipeViewSet, user, {"tags": tag_ids}),
+            ),
+            ("recipebooks", list_queryset(views.RecipeBookViewSet, user)),
+            ("tags", list_queryset(views.TagViewSet, user)),
+            ("ingredients", list_queryset(views.IngredientViewSet, user)),
+        )
+
+        for name, queryset in queries:
+            plan = queryset.explain()
+            full_scan = FULL_SCAN.search(plan)
+            failures += bool(full_scan)
+            verdict = f"FULL SCAN ({full_scan.group(0)})" if full_scan else "index"
+            command.stdout.write(f"{size:>8}  {name:<14} {verdict}")
+            if command.verbosity > 1:
+                command.stdout.write(plan)
+
+        get_user_model().objects.filter(pk__in=[u.pk for u in users]).delete()
+
+    if failures:
+        raise CommandError(f"{failures} list queries are not using an index")
+
+
+def timed(queryset, repeat):
+    """Returns the ids a queryset yields and its best wall time"""
+    best = None
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        ids = list(queryset.values_list("id", flat=True))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return ids, best
+
+
+@scenario("recipe_filter")
+def recipe_filter(command, sizes, repeat, tag_pool=50, filter_ids=10):
+    """Compare join based and semi-join tag filtering"""
+    command.stdout.write("recipes  strategy  rows  seconds")
+
+    for size in sizes:
+        user = seed_user()
+        seed_recipes(user, size, tags_per_recipe=0, ingredients_per_recipe=0)
+        Tag.objects.bulk_create(
+            [Tag(user=user, name=f"Tag {i}") for i in range(tag_pool)]
+        )
+        tag_ids = list(Tag.objects.filter(user=user).values_list("id", flat=True))
+        recipe_ids = list(Recipe.objects.filter(user=user).values_list("id", flat=True))
+        Recipe.tags.through.objects.bulk_create(
+            [
+                Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+                for recipe_id in recipe_ids
+                for tag_id in {
+                    tag_ids[recipe_id * step % tag_pool] for step in (1, 7, 13)
+                }
+            ]
+        )
+
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+        wanted = tag_ids[:filter_ids]
+        pair = [tag_ids[recipe_ids[0] * step % tag_pool] for step in (1, 7)]
+        recipes = Recipe.objects.filter(user=user)
+        strategies = (
+            ("join", recipes.filter(tags__id__in=wanted)),
+            ("join+distinct", recipes.filter(tags__id__in=wanted).distinct()),
+            (MATCH_ANY, filter_by_related(recipes, "tags", wanted, MATCH_ANY)),
+            (MATCH_ALL, filter_by_related(recipes, "tags", pair, MATCH_ALL)),
+        )
+
+        for name, queryset in strategies:
+            ids, seconds = timed(queryset, repeat)
+            command.stdout.write(f"{size:>7}  {name:<14} {len(ids):>7}  {seconds:.4f}")
+
+        user.delete()
+
+
+@scenario("assigned_only")
+def assigned_only(command, sizes, repeat):
+    """Compare join based and semi-join filtering of tags used by recipes"""
+    command.stdout.write("recipes  strategy        rows  seconds")
+
+    for size in sizes:
+        user = seed_user()
+        seed_recipes(user, size, tags_per_recipe=20, ingredients_per_recipe=0)
+        Tag.objects.bulk_create([Tag(user=user, name=f"Unused {i}") for i in range(20)])
+
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+        tags = Tag.objects.filter(user=user).order_by("-name")
+        strategies = (
+            ("join+distinct", tags.filter(recipe__isnull=False).distinct()),
+            ("exists", filter_assigned(tags, "recipe")),
+        )
+
+        for name, queryset in strategies:
+            ids, seconds = timed(queryset, repeat)
+            command.stdout.write(f"{size:>7}  {name:<14} {len(ids):>5}  {seconds:.4f}")
+
+        user.delete()
+
+
+@scenario("autocomplete")
+def autocomplete(
+    command, sizes, repeat, prefixes=("i", "ingredient 1", "ingredeint 42")
+):
+    """Measure autocomplete latency percentiles through the view"""
+    factory = APIRequestFactory()
+    view = views.IngredientViewSet.as_view({"get": "autocomplete"})
+    command.stdout.write("ingredients  q               p50 ms  p99 ms")
+
+    for size in sizes:
+        user = seed_user()
+        seed_recipes(user, 0, tags_per_recipe=0, ingredients_per_recipe=size)
+
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+        for text in prefixes:
+            request = factory.get("/", {"q": text})
+            force_authenticate(request, user=user)
+            latencies = []
+            for _ in range(max(repeat, 100)):
+                start = time.perf_counter()
+                response = view(request)
+                response.render()
+                latencies.append((time.perf_counter() - start) * 1000)
+
+            latencies.sort()
+            command.stdout.write(
+                f"{size:>11}  {text:<15} {percentile(latencies, 50):>6.2f}  "
+                f"{percentile(latencies, 99):>6.2f}"
+            )
+
+        user.delete()
+
+
+@scenario("recipe_search")
+def recipe_search(command, sizes, repeat):
+    """Time ranked recipe searches and report how they are planned"""
+    command.stdout.write("recipes  search        rows  seconds  plan")
+
+    for size in sizes:
+        user = seed_user()
+        seed_recipes(user, size)
+
+        if connection.vendor == "postgresql":
+            Recipe.objects.filter(user=user).update(
+                search_vector=search.search_vector()
+            )
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+        # A title, a tag name and a misspelled title
+        for text in (f"Recipe {size // 2}", "Tag 1", f"Recpie {size // 2}"):
+            queryset = list_queryset(views.RecipeViewSet, user, {"search": text})
+            ids, seconds = timed(queryset, repeat)
+            full_scan = FULL_SCAN.search(queryset.explain())
+            verdict = "full scan" if full_scan else "index"
+            command.stdout.write(
+                f"{size:>7}  {text:<12} {len(ids):>5}  {seconds:.4f}  {verdict}"
+            )
+
+        user.delete()
+
+
+def best_time(func, repeat):
+    """Returns the result of func and its best wall time"""
+    best = None
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return result, best
+
+
+@scenario("list_readers")
+def list_readers(command, sizes, repeat):
+    """Compare list serialization through DRF serializers and ListReader"""
+    command.stdout.write("objects  model        serializer  reader  speedup")
+
+    for size in sizes:
+        user = seed_user()
+        recipes = seed_recipes(user, size)
+        book = RecipeBook.objects.create(user=user, title="Benchmark")
+        book.recipes.add(*recipes)
+
+        cases = (
+            (
+                "recipe",
+                serializers.RecipeSerializer,
+                Recipe.objects.filter(user=user).order_by("-id"),
+                views.RECIPE_RELATIONS,
+            ),
+            (
+                "recipebook",
+                serializers.RecipeBookSerializer,
+                RecipeBook.objects.filter(user=user).order_by("-id"),
+                (Prefetch("recipes", queryset=Recipe.objects.order_by("id")),),
+            ),
+        )
+
+        for name, serializer_class, queryset, relations in cases:
+            expected, slow = best_time(
+                lambda: serializer_class(
+                    queryset.prefetch_related(*relations), many=True
+                ).data,
+                repeat,
+            )
+            reader = ListReader(serializer_class)
+            data, fast = best_time(
+                lambda: reader.represent(list(reader.get_queryset(queryset))), repeat
+            )
+            if data != expected:
+                raise CommandError(f"ListReader output differs for {name}")
+
+            command.stdout.write(
+                f"{size:>7}  {name:<11} {slow:>10.4f}  {fast:.4f}  {slow / fast:>6.1f}x"
+            )
+
+        user.delete()
+
+
+@scenario("list_aggregation")
+def list_aggregation(command, sizes, repeat):
+    """Compare reading recipe relation ids with prefetches, batches and arrays"""
+    command.stdout.write("per page  strategy   queries  seconds")
+
+    user = seed_user()
+    seed_recipes(user, max(sizes), tags_per_recipe=5, ingredients_per_recipe=8)
+    recipes = Recipe.objects.filter(user=user).order_by("-id")
+
+    def read_page(reader, size):
+        return reader.represent(list(reader.get_queryset(recipes)[:size]))
+
+    strategies = [
+        (
+            "prefetch",
+            lambda size: serializers.RecipeSerializer(
+                recipes.prefetch_related(*views.RECIPE_RELATIONS)[:size], many=True
+            ).data,
+        ),
+        (
+            "batched",
+            lambda size: read_page(
+                ListReader(serializers.RecipeSerializer, aggregate=False), size
+            ),
+        ),
+    ]
+    if connection.vendor == "postgresql":
+        strategies.append(
+            (
+                "array",
+                lambda size: read_page(
+                    ListReader(serializers.RecipeSerializer, aggregate=True), size
+                ),
+            )
+        )
+
+    for size in sizes:
+        expected = None
+        for name, read in strategies:
+            with CaptureQueriesContext(connection) as ctx:
+                data, seconds = best_time(lambda: read(size), repeat)
+            if expected is None:
+                expected = data
+            elif data != expected:
+                raise CommandError(f"{name} output differs from the serializer")
+
+            queries = len(ctx.captured_queries) // repeat
+            command.stdout.write(f"{size:>8}  {name:<9} {queries:>8}  {seconds:.4f}")
+
+
+@scenario("json_render")
+def json_render(command, sizes, repeat):
+    """Compare rendering and parsing recipe book payloads with each JSON backend"""
+    command.stdout.write("recipes  backend  render  parse")
+
+    for size in sizes:
+        user = seed_user()
+        book = RecipeBook.objects.create(user=user, title="Benchmark")
+        book.recipes.add(*seed_recipes(user, size))
+        data = serializers.RecipeBookDetailSerializer(
+            RecipeBook.objects.prefetch_related(
+                *views.RecipeBookViewSet.prefetch_plans["retrieve"]
+            ).get(id=book.id)
+        ).data
+
+        expected = None
+        for name, renderer, parser in (
+            ("stdlib", JSONRenderer(), JSONParser()),
+            ("fast", FastJSONRenderer(), FastJSONParser()),
+        ):
+            body, render = best_time(lambda: renderer.render(data), repeat)
+            parsed, parse = best_time(
+                lambda: parser.parse(io.BytesIO(body), "application/json"), repeat
+            )
+            if expected is None:
+                expected = body
+            elif body != expected:
+                raise CommandError(f"{name} output differs from the stdlib output")
+            if parsed != json.loads(expected):
+                raise CommandError(f"{name} parser output differs from the input")
+
+            command.stdout.write(f"{size:>7}  {name:<7} {render:.4f}  {parse:.4f}")
+
+        user.delete()
+
+
+def peak_memory(func):
+    """Returns the wall time and peak traced memory in KiB of calling func"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        func()
+        return time.perf_counter() - start, tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+@scenario("export")
+def export(command, sizes, repeat):
+    """Compare the memory of streaming an export and rendering the full list"""
+    factory = APIRequestFactory()
+    view = views.RecipeViewSet.as_view(
+        {"get": "export"}, **views.RecipeViewSet.export.kwargs
+    )
+    command.stdout.write("recipes  strategy   peak KiB  seconds")
+
+    for size in sizes:
+        user = seed_user()
+        seed_recipes(user, size)
+        recipes = Recipe.objects.filter(user=user).order_by("-id")
+
+        def stream():
+            request = factory.get("/")
+            force_authenticate(request, user=user)
+            for _ in view(request).streaming_content:
+                pass
+
+        def render_all():
+            data = serializers.RecipeSerializer(
+                recipes.prefetch_related(*views.RECIPE_RELATIONS), many=True
+            ).data
+            FastJSONRenderer().render(data)
+
+        for name, func in (("list", render_all), ("stream", stream)):
+            seconds, peak = peak_memory(func)
+            command.stdout.write(f"{size:>7}  {name:<8} {peak:>10.0f}  {seconds:.4f}")
+
+        user.delete()
+
+
+class Command(BaseCommand):
+    """Django command to benchmark recipe API scenarios"""
+
+    help = "Benchmarks recipe API scenarios against a rolled back dataset"
+
+    def add_arguments(self, parser):
+        parser.add_argument("scenario", choices=sorted(SCENARIOS))
+        parser.add_argument("--sizes", nargs="+", type=int, default=[10, 100, 1000])
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        run = SCENARIOS[options["scenario"]]
+        self.verbosity = options["verbosity"]
+
+        try:
+            with transaction.atomic():
+                run(self, options["sizes"], options["repeat"])
+                raise _Rollback
+        except _Rollback:
+            pass
@@ -0,0 +1,109 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+BLOCK_SIZE = 64 * 2**10
+IMMUTABLE = "private, max-age=31536000, immutable"
+
+
+def parse_range(header, size):
+    """Returns the (start, end) of a single byte range, None or raises ValueError
+
+    None means the header should be ignored and the whole file served.
+    ValueError means the range cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None:
+        return None
+
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start, end = int(start), min(int(end), size - 1) if end else size - 1
+
+    if start > end or start >= size:
+        raise ValueError("Unsatisfiable range")
+
+    return start, end
+
+
+def _read_range(path, start, length):
+    with open(path, "rb") as media_file:
+        media_file.seek(start)
+        while length > 0:
+            block = media_file.read(min(BLOCK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+
+
+def _file_response(request, name, path):
+    try:
+        size = os.path.getsize(path)
+    except FileNotFoundError:
+        raise Http404
+
+    try:
+        byte_range = parse_range(request.META.get("HTTP_RANGE"), size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    if byte_range is None:
+        return FileResponse(open(path, "rb"))
+
+    start, end = byte_range
+    response = StreamingHttpResponse(
+        _read_range(path, start, end - start + 1), status=206
+    )
+    response["Content-Length"] = str(end - start + 1)
+    response["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    return response
+
+
+def _accel_response(request, name, path):
+    response = HttpResponse()
+    response["X-Accel-Redirect"] = settings.MEDIA_ACCEL_PREFIX + name
+
+    return response
+
+
+def _sendfile_response(request, name, path):
+    response = HttpResponse()
+    response["X-Sendfile"] = path
+
+    return response
+
+
+DELIVERY_MODES = {
+    "file": _file_response,
+    "x-accel-redirect": _accel_response,
+    "x-sendfile": _sendfile_response,
+}
+
+
+def media_response(request, name, path):
+    """Returns a response delivering a media file with the configured mode
+
+    The file and x-accel-redirect/x-sendfile modes let the front server
+    or the WSGI file wrapper transfer the bytes instead of Python.
+    """
+    response = DELIVERY_MODES[settings.MEDIA_DELIVERY](request, name, path)
+
+    if response.status_code in (200, 206):
+        content_type, _ = mimetypes.guess_type(name)
+        response["Content-Type"] = content_type or "application/octet-stream"
+        response["Accept-Ranges"] = "bytes"
+        response["Cache-Control"] = IMMUTABLE
+
+    return response
@@ -0,0 +1,157 @@
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+
+
+class IdCursorPagination(CursorPagination):
+    """Keyset pagination over the newest objects first"""
+
+    ordering = "-id"
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+def _ordering_field(queryset, name):
+    """Returns the model or annotation field a queryset is ordered by"""
+    annotation = queryset.query.annotations.get(name)
+    if annotation is not None:
+        return annotation.output_field
+
+    return queryset.model._meta.get_field(name)
+
+
+class KeysetCursorPagination(IdCursorPagination):
+    """Keyset pagination over an ordering made unique by its last field
+
+    DRF's cursor only holds the first ordering field and skips the objects
+    sharing its value with an offset, which grows with the ties. Here the
+    cursor holds every ordering field so each page is filtered to the
+    objects after it and only reads page_size rows.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        position = self.cursor.position if self.cursor is not None else None
+
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(
+                field[1:] if field.startswith("-") else f"-{field}"
+                for field in ordering
+            )
+
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.after(queryset, ordering, position))
+
+        results = list(queryset[: self.page_size + 1])
+        self.page = results[: self.page_size]
+        has_following = len(results) > len(self.page)
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = position is not None, has_following
+        else:
+            self.has_next, self.has_previous = has_following, position is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def after(self, queryset, ordering, position):
+        """Returns the filter of the objects following position in ordering
+
+        Each value of the position is checked against its ordering field,
+        a tampered cursor is not found.
+        """
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        condition = Q()
+        equal = {}
+        for field, value in zip(ordering, values):
+            name = field.lstrip("-")
+            try:
+                if value is None:
+                    raise ValidationError("Cursor values cannot be null.")
+                value = _ordering_field(queryset, name).to_python(value)
+            except ValidationError:
+                raise NotFound(self.invalid_cursor_message)
+
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition |= Q(**equal, **{f"{name}__{lookup}": value})
+            equal[name] = value
+
+        return condition
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        position = self.cursor.position if not self.page else self.page_position(-1)
+
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+
+        position = self.cursor.position if not self.page else self.page_position(0)
+
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def page_position(self, index):
+        """Returns the cursor position of an object of the page"""
+        instance = self.page[index]
+        values = [
+            instance[field] if isinstance(instance, dict) else getattr(instance, field)
+            for field in (field.lstrip("-") for field in self.ordering)
+        ]
+
+        return json.dumps(values, separators=(",", ":"))
+
+
+class NameCursorPagination(KeysetCursorPagination):
+    """Keyset pagination over objects in reverse name order"""
+
+    ordering = ("-name", "-id")
+
+
+class UsageCursorPagination(KeysetCursorPagination):
+    """Keyset pagination over the most used objects first"""
+
+    ordering = ("-usage_count", "-id")
+
+
+class RankedPagination(IdCursorPagination):
+    """Returns only the best ranked page of results
+
+    Ranks are not unique or stable enough to continue from, so next and
+    previous are always empty. Clients raise page_size or refine the query.
+    """
+
+    ordering = ()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return list(queryset[: self.get_page_size(request)])
+
+    def get_next_link(self):
+        return None
+
+    def get_previous_link(self):
+        return None
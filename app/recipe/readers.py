@@ -0,0 +1,178 @@
+from collections import defaultdict
+from itertools import islice
+
+from django.contrib.postgres.fields import ArrayField
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections, models
+from django.db.models import OuterRef, Subquery
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+
+# Fields whose to_representation leaves values() output unchanged
+PASSTHROUGH_FIELDS = (serializers.CharField, serializers.IntegerField)
+
+
+def related_ids(model, relation, ids):
+    """Returns the related ids of each object of a many to many relation
+
+    The ids come from one query on the through table, ordered by id.
+    """
+    field = model._meta.get_field(relation)
+    through = field.remote_field.through
+    source = field.m2m_field_name() + "_id"
+    target = field.m2m_reverse_field_name() + "_id"
+    grouped = defaultdict(list)
+
+    rows = (
+        through.objects.filter(**{f"{source}__in": ids})
+        .order_by(source, target)
+        .values_list(source, target)
+    )
+    for object_id, related_id in rows:
+        grouped[object_id].append(related_id)
+
+    return grouped
+
+
+class ArraySubquery(Subquery):
+    """Collects the single column of a correlated subquery into an array"""
+
+    template = "ARRAY(%(subquery)s)"
+
+    def __init__(self, queryset, base_field, **extra):
+        super().__init__(queryset, output_field=ArrayField(base_field), **extra)
+
+
+def related_ids_subquery(model, relation):
+    """Returns an array of the related ids of a many to many relation
+
+    The ids are ordered by id, like related_ids() orders them.
+    """
+    field = model._meta.get_field(relation)
+    through = field.remote_field.through
+    source = field.m2m_field_name() + "_id"
+    target = field.m2m_reverse_field_name() + "_id"
+
+    return ArraySubquery(
+        through.objects.filter(**{source: OuterRef("pk")})
+        .order_by(target)
+        .values(target),
+        models.IntegerField(),
+    )
+
+
+class ListReader:
+    """Builds the list representation of a flat serializer from values() rows
+
+    It renders the same data as serializer_class(many=True) without
+    instantiating models or going through every field per object. Many
+    to many primary key fields are aggregated into arrays by the row query
+    on PostgreSQL, and read with one through table query each elsewhere or
+    when aggregate is False. Read-only fields that are not model fields are
+    read from annotations. Raises TypeError for serializers with fields it
+    cannot read this way.
+    """
+
+    def __init__(self, serializer_class, fields=None, aggregate=None):
+        self.aggregate = aggregate
+        serializer = serializer_class()
+        self.model = serializer.Meta.model
+        self.fields = [
+            field
+            for name, field in serializer.fields.items()
+            if not field.write_only and (fields is None or name in fields)
+        ]
+        self.columns = []
+        self.relations = []
+        self.formatters = {}
+
+        for field in self.fields:
+            try:
+                model_field = self.model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                if field.read_only and isinstance(field, PASSTHROUGH_FIELDS):
+                    # Read from the queryset annotation of the same name
+                    self.columns.append(field.source)
+                    continue
+                raise TypeError(f"Cannot read field {field.field_name} from values()")
+
+            if isinstance(field, ManyRelatedField) and isinstance(
+                field.child_relation, PrimaryKeyRelatedField
+            ):
+                self.relations.append(field.source)
+            elif model_field.concrete and not model_field.is_relation:
+                self.columns.append(field.source)
+                if not isinstance(field, PASSTHROUGH_FIELDS):
+                    self.formatters[field.source] = field.to_representation
+            else:
+                raise TypeError(f"Cannot read field {field.field_name} from values()")
+
+    def get_queryset(self, queryset, ordering=()):
+        """Returns the values() queryset the rows are read from"""
+        pk = self.model._meta.pk.name
+        columns = {pk, *self.columns, *(name.lstrip("-") for name in ordering)}
+        queryset = queryset.prefetch_related(None)
+
+        if self.aggregate is None:
+            self.aggregate = connections[queryset.db].vendor == "postgresql"
+
+        if self.aggregate and self.relations:
+            queryset = queryset.annotate(
+                **{
+                    f"{relation}_ids": related_ids_subquery(self.model, relation)
+                    for relation in self.relations
+                }
+            )
+            columns.update(f"{relation}_ids" for relation in self.relations)
+
+        return queryset.values(*columns)
+
+    def represent(self, rows):
+        """Returns the representation of each row"""
+        pk = self.model._meta.pk.name
+
+        if self.aggregate:
+            related = {
+                relation: {row[pk]: row[f"{relation}_ids"] for row in rows}
+                for relation in self.relations
+            }
+        else:
+            ids = [row[pk] for row in rows]
+            related = {
+                relation: related_ids(self.model, relation, ids)
+                for relation in self.relations
+            }
+
+        data = []
+
+        for row in rows:
+            item = {}
+            for field in self.fields:
+                source = field.source
+                if source in related:
+                    item[field.field_name] = related[source].get(row[pk], [])
+                    continue
+
+                value = row[source]
+                formatter = self.formatters.get(source)
+                if value is not None and formatter is not None:
+                    value = formatter(value)
+                item[field.field_name] = value
+            data.append(item)
+
+        return data
+
+    def read_chunks(self, queryset, chunk_size):
+        """Yields the representation of a values() queryset chunk by chunk
+
+        Rows are streamed with iterator(), through a server-side cursor
+        where the database has them, so only one chunk is held at a time.
+        """
+        rows = queryset.iterator(chunk_size=chunk_size)
+
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return
+
+            yield self.represent(chunk)
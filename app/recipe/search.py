@@ -0,0 +1,152 @@
+import threading
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    TrigramSimilarity,
+)
+from django.db import connections, transaction
+from django.db.models import (
+    Case,
+    F,
+    FloatField,
+    OuterRef,
+    Q,
+    Subquery,
+    TextField,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce, Upper
+
+from core.models import Recipe
+
+# Must match the configuration core.0010 built the vectors with
+SEARCH_CONFIG = "english"
+SEARCH_WEIGHTS = (("title", "A"), ("tags", "B"), ("ingredients", "C"))
+
+_pending = threading.local()
+
+
+def related_names(relation):
+    """Returns the space separated names of a recipe's related objects"""
+    through = Recipe._meta.get_field(relation).remote_field.through
+    target = Recipe._meta.get_field(relation).m2m_reverse_field_name()
+
+    return Subquery(
+        through.objects.filter(recipe=OuterRef("pk"))
+        .values("recipe")
+        .annotate(names=StringAgg(f"{target}__name", " "))
+        .values("names"),
+        output_field=TextField(),
+    )
+
+
+def search_vector():
+    """Returns the weighted search document of a recipe"""
+    vector = None
+
+    for source, weight in SEARCH_WEIGHTS:
+        expression = source if source == "title" else related_names(source)
+        part = SearchVector(expression, weight=weight, config=SEARCH_CONFIG)
+        vector = part if vector is None else vector + part
+
+    return vector
+
+
+def schedule_search_update(recipe_ids, using):
+    """Rebuilds the search vector of recipes once the transaction commits
+
+    Changes made in one transaction are rebuilt by a single query. Search
+    vectors are only maintained on PostgreSQL.
+    """
+    if connections[using].vendor != "postgresql":
+        return
+
+    pending = _pending.__dict__.setdefault(using, set())
+    pending.update(recipe_ids)
+    transaction.on_commit(lambda: update_search_vectors(using), using=using)
+
+
+def update_search_vectors(using):
+    """Rebuilds the search vector of the recipes scheduled for an update"""
+    ids = _pending.__dict__.pop(using, None)
+
+    if ids:
+        Recipe.objects.using(using).filter(pk__in=ids).update(
+            search_vector=search_vector()
+        )
+
+
+def search_recipes(queryset, text):
+    """Filters the recipes matching the search text, best ranked first
+
+    On PostgreSQL the text is matched against the search vector, or by
+    trigram similarity against the title so that typos still match. Other
+    databases match every word of the text against the title, tag names or
+    ingredient names, ranking title matches first.
+    """
+    if connections[queryset.db].vendor == "postgresql":
+        query = SearchQuery(text, config=SEARCH_CONFIG)
+
+        return (
+            queryset.filter(Q(search_vector=query) | Q(title__trigram_similar=text))
+            .annotate(
+                rank=Coalesce(SearchRank(F("search_vector"), query), Value(0.0))
+                + TrigramSimilarity("title", text)
+            )
+            .order_by("-rank", "-id")
+        )
+
+    for word in text.split():
+        queryset = queryset.filter(
+            Q(title__icontains=word)
+            | Q(pk__in=_related_matches("tags", word))
+            | Q(pk__in=_related_matches("ingredients", word))
+        )
+
+    return queryset.annotate(
+        rank=Case(
+            When(title__icontains=text, then=Value(1.0)),
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+    ).order_by("-rank", "-id")
+
+
+def _related_matches(relation, word):
+    """Returns the ids of recipes with a related object named like word"""
+    through = Recipe._meta.get_field(relation).remote_field.through
+    target = Recipe._meta.get_field(relation).m2m_reverse_field_name()
+
+    return through.objects.filter(**{f"{target}__name__icontains": word}).values(
+        "recipe_id"
+    )
+
+
+def autocomplete(queryset, text, limit):
+    """Returns up to limit objects named starting with text, then similar names
+
+    Prefix matches come first in case-insensitive name order. On PostgreSQL the rest are
+    filled in by trigram similarity so that typos still match, elsewhere
+    by names containing the text.
+    """
+    matches = list(
+        queryset.filter(name__istartswith=text).order_by(Upper("name"), "id")[:limit]
+    )
+
+    if len(matches) < limit:
+        rest = queryset.exclude(name__istartswith=text)
+        if connections[queryset.db].vendor == "postgresql":
+            rest = (
+                rest.filter(name__trigram_similar=text)
+                .annotate(similarity=TrigramSimilarity("name", text))
+                .order_by("-similarity", Upper("name"), "id")
+            )
+        else:
+            rest = rest.filter(name__icontains=text).order_by(Upper("name"), "id")
+        matches += rest[: limit - len(matches)]
+
+    return matches
@@ -1,51 +1,394 @@
+from django.db import connections, router, transaction
 from rest_framework import serializers
 from core.models import Tag, Ingredient, Recipe, RecipeBook
+from recipe.fields import BatchedManyRelatedField, UserPrimaryKeyRelatedField
+from recipe.images import variant_urls
+from recipe.uploads import probe_image
 
 
-class TagSerializer(serializers.ModelSerializer):
+def _pop_many_to_many(model, items):
+    """Removes many to many values from each item and returns them"""
+    names = [field.name for field in model._meta.many_to_many]
+
+    return [{name: item.pop(name) for name in names if name in item} for item in items]
+
+
+def _bulk_set_many_to_many(model, instances, related, replace=False):
+    """Sets the related objects of many instances with one insert per field"""
+    for field in model._meta.many_to_many:
+        through = field.remote_field.through
+        source = field.m2m_field_name()
+        target = field.m2m_reverse_field_name()
+        changed = [
+            (instance, values[field.name])
+            for instance, values in zip(instances, related)
+            if field.name in values
+        ]
+
+        if not changed:
+            continue
+
+        if replace:
+            through.objects.filter(
+                **{f"{source}__in": [instance.pk for instance, _ in changed]}
+            ).delete()
+        through.objects.bulk_create(
+            [
+                through(**{f"{source}_id": instance.pk, f"{target}_id": obj.pk})
+                for instance, objs in changed
+                for obj in objs
+            ]
+        )
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """Creates and updates many objects with batched queries"""
+
+    def run_validation(self, data=serializers.empty):
+        fields = [
+            field
+            for field in self.child.fields.values()
+            if isinstance(field, BatchedManyRelatedField) and not field.read_only
+        ]
+
+        if isinstance(data, list):
+            for field in fields:
+                field.preload(
+                    item.get(field.field_name)
+                    for item in data
+                    if isinstance(item, dict)
+                )
+
+        try:
+            return super().run_validation(data)
+        finally:
+            for field in fields:
+                field.preloaded = None
+
+    def resolve_names(self, items):
+        resolve = getattr(self.child, "resolve_names", None)
+        if resolve is not None:
+            resolve(items)
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        self.resolve_names(validated_data)
+        related = _pop_many_to_many(model, validated_data)
+        instances = [model(**attrs) for attrs in validated_data]
+
+        features = connections[router.db_for_write(model)].features
+        if features.can_return_ids_from_bulk_insert:
+            model.objects.bulk_create(instances)
+        else:
+            for instance in instances:
+                instance.save()
+
+        _bulk_set_many_to_many(model, instances, related)
+
+        return instances
+
+    def update(self, instances, validated_data):
+        model = self.child.Meta.model
+        self.resolve_names(validated_data)
+        related = _pop_many_to_many(model, validated_data)
+        fields = set()
+
+        for instance, attrs in zip(instances, validated_data):
+            for attr, value in attrs.items():
+                setattr(instance, attr, value)
+            fields.update(attrs)
+
+        if fields:
+            model.objects.bulk_update(instances, fields)
+
+        _bulk_set_many_to_many(model, instances, related, replace=True)
+
+        return instances
+
+
+class SparseFieldsMixin:
+    """Drops the fields left out of the selected_fields context entry
+
+    field_columns maps fields that read the whole object (source "*") to
+    the model columns they need.
+    """
+
+    field_columns = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = self.context.get("selected_fields")
+
+        if selected is not None:
+            for name in set(self.fields) - set(selected):
+                self.fields.pop(name)
+
+
+NAME_TAKEN = "An object with this name already exists."
+
+
+class NamedBulkListSerializer(BulkListSerializer):
+    """Rejects names the user already has or that repeat within the request
+
+    Every submitted name is checked with a single query.
+    """
+
+    def to_internal_value(self, data):
+        items = super().to_internal_value(data)
+        request = self.context.get("request")
+        names = [item["name"] for item in items if "name" in item]
+
+        if request is None or not names:
+            return items
+
+        taken = dict(
+            self.child.Meta.model.objects.filter(
+                user=request.user, name__in=names
+            ).values_list("name", "pk")
+        )
+        instances = self.instance or [None] * len(items)
+        seen = set()
+        errors = []
+
+        for item, instance in zip(items, instances):
+            name = item.get("name")
+            pk = instance.pk if instance else None
+            if name is not None and (name in seen or taken.get(name, pk) != pk):
+                errors.append({"name": [NAME_TAKEN]})
+            else:
+                errors.append({})
+            seen.add(name)
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+        return items
+
+
+class UniqueNameMixin:
+    """Rejects names the requesting user already has"""
+
+    def validate_name(self, value):
+        request = self.context.get("request")
+
+        # Checked for every item at once by NamedBulkListSerializer
+        if request is None or isinstance(self.parent, serializers.ListSerializer):
+            return value
+
+        queryset = self.Meta.model.objects.filter(user=request.user, name=value)
+        if self.instance is not None:
+            queryset = queryset.exclude(pk=self.instance.pk)
+        if queryset.exists():
+            raise serializers.ValidationError(NAME_TAKEN)
+
+        return value
+
+
+class TagSerializer(UniqueNameMixin, SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = ("id", "name")
         read_only_fields = ("id",)
+        list_serializer_class = NamedBulkListSerializer
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(
+    UniqueNameMixin, SparseFieldsMixin, serializers.ModelSerializer
+):
     class Meta:
         model = Ingredient
         fields = ("id", "name")
         read_only_fields = ("id",)
+        list_serializer_class = NamedBulkListSerializer
+
+
+class TagUsageSerializer(TagSerializer):
+    usage_count = serializers.IntegerField(read_only=True)
+
+    class Meta(TagSerializer.Meta):
+        fields = TagSerializer.Meta.fields + ("usage_count",)
+
+
+class IngredientUsageSerializer(IngredientSerializer):
+    usage_count = serializers.IntegerField(read_only=True)
+
+    class Meta(IngredientSerializer.Meta):
+        fields = IngredientSerializer.Meta.fields + ("usage_count",)
+
+
+def _get_or_create_named(model, user, names):
+    """Returns the user's objects by name, creating the missing ones at once"""
+    objects = {obj.name: obj for obj in model.objects.filter(user=user, name__in=names)}
+    missing = [name for name in names if name not in objects]
+
+    if missing:
+        # Conflicts are names created concurrently, read back below
+        model.objects.bulk_create(
+            [model(user=user, name=name) for name in missing], ignore_conflicts=True
+        )
+        objects.update(
+            (obj.name, obj) for obj in model.objects.filter(user=user, name__in=missing)
+        )
+
+    return objects
+
+
+class NamedRelationsMixin:
+    """Accepts related tags and ingredients by name as well as by id
+
+    Names the user has no object for yet are created. Given names replace
+    the relation together with any ids sent alongside them. Relations are
+    written with one insert per through table.
+    """
+
+    named_relations = {"tag_names": "tags", "ingredient_names": "ingredients"}
+
+    def resolve_names(self, items):
+        """Moves the names of every item into its relations with one query each"""
+        for names_field, relation in self.named_relations.items():
+            named = [
+                (item, item.pop(names_field)) for item in items if names_field in item
+            ]
+            if not named:
+                continue
+
+            model = self.Meta.model._meta.get_field(relation).related_model
+            user = named[0][0].get("user") or self.instance.user
+            objects = _get_or_create_named(
+                model, user, list(dict.fromkeys(n for _, names in named for n in names))
+            )
+
+            for item, names in named:
+                related = list(item.get(relation, ()))
+                related += [objects[name] for name in names]
+                item[relation] = list(dict.fromkeys(related))
+
+    def create(self, validated_data):
+        model = self.Meta.model
+        self.resolve_names([validated_data])
+        related = _pop_many_to_many(model, [validated_data])
+
+        # Relation inserts send no signals, the saved instance's ones
+        # schedule their work for the commit
+        with transaction.atomic():
+            instance = super().create(validated_data)
+            _bulk_set_many_to_many(model, [instance], related)
+
+        return instance
+
+    def update(self, instance, validated_data):
+        model = self.Meta.model
+        self.resolve_names([validated_data])
+        related = _pop_many_to_many(model, [validated_data])
 
+        with transaction.atomic():
+            instance = super().update(instance, validated_data)
+            _bulk_set_many_to_many(model, [instance], related, replace=True)
 
-class RecipeSerializer(serializers.ModelSerializer):
-    ingredients = serializers.PrimaryKeyRelatedField(
-        many=True, queryset=Ingredient.objects.all()
+        return instance
+
+
+class RecipeSerializer(
+    NamedRelationsMixin, SparseFieldsMixin, serializers.ModelSerializer
+):
+    ingredients = UserPrimaryKeyRelatedField(
+        many=True, queryset=Ingredient.objects.all(), required=False
+    )
+    tags = UserPrimaryKeyRelatedField(
+        many=True, queryset=Tag.objects.all(), required=False
+    )
+    tag_names = serializers.ListField(
+        child=serializers.CharField(max_length=255), write_only=True, required=False
+    )
+    ingredient_names = serializers.ListField(
+        child=serializers.CharField(max_length=255), write_only=True, required=False
     )
-    tags = serializers.PrimaryKeyRelatedField(many=True, queryset=Tag.objects.all())
 
     class Meta:
         model = Recipe
-        fields = ("id", "title", "ingredients", "tags", "time_minutes", "price", "link")
+        fields = (
+            "id",
+            "title",
+            "ingredients",
+            "tags",
+            "time_minutes",
+            "price",
+            "link",
+            "tag_names",
+            "ingredient_names",
+        )
         read_only_fields = ("id",)
+        list_serializer_class = BulkListSerializer
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """URLs of the resized variants of a recipe image once they are ready"""
+
+    def __init__(self, **kwargs):
+        kwargs["source"] = "*"
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        if recipe.image_status != Recipe.IMAGE_READY:
+            return {}
+
+        urls = variant_urls(recipe.image.name)
+        request = self.context.get("request")
+        if request is not None:
+            urls = {name: request.build_absolute_uri(url) for name, url in urls.items()}
+
+        return urls
 
 
 class RecipeDetailSerializer(RecipeSerializer):
     ingredients = IngredientSerializer(many=True, read_only=True)
     tags = TagSerializer(many=True, read_only=True)
+    image = serializers.ImageField(read_only=True)
+    image_variants = ImageVariantsField()
+
+    field_columns = {"image_variants": ("image", "image_status")}
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + (
+            "image",
+            "image_status",
+            "image_variants",
+        )
+        read_only_fields = ("id", "image_status")
+
+
+class ProbedImageField(serializers.FileField):
+    """Image field validated from the image header instead of a full decode"""
+
+    default_error_messages = {"invalid_image": "{message}"}
+
+    def to_internal_value(self, data):
+        data = super().to_internal_value(data)
+
+        if getattr(data, "image_format", None) is None:
+            try:
+                probe_image(data)
+            except ValueError as exc:
+                self.fail("invalid_image", message=str(exc))
+            data.seek(0)
+
+        return data
 
 
 class RecipeImageSerializer(serializers.ModelSerializer):
     """Serializer for uplaoding images to recipes"""
 
+    image = ProbedImageField()
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = Recipe
-        fields = ("id", "image")
-        read_only_fields = ("id",)
+        fields = ("id", "image", "image_status", "image_variants")
+        read_only_fields = ("id", "image_status")
 
 
-class RecipeBookSerializer(serializers.ModelSerializer):
-    recipes = serializers.PrimaryKeyRelatedField(
-        many=True, queryset=Recipe.objects.all()
-    )
+class RecipeBookSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    recipes = UserPrimaryKeyRelatedField(many=True, queryset=Recipe.objects.all())
 
     class Meta:
         model = RecipeBook
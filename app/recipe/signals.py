@@ -0,0 +1,75 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from core.models import Tag, Ingredient, Recipe, RecipeBook
+from recipe.cache import schedule_invalidation
+from recipe.search import schedule_search_update
+
+CACHED_MODELS = (Tag, Ingredient, Recipe, RecipeBook)
+CACHED_RELATIONS = (
+    Recipe.tags.through,
+    Recipe.ingredients.through,
+    RecipeBook.recipes.through,
+)
+SEARCHED_MODELS = (Tag, Ingredient)
+SEARCHED_RELATIONS = (Recipe.tags.through, Recipe.ingredients.through)
+
+
+def invalidate_owner(sender, instance, **kwargs):
+    """Invalidate the cached responses of the instance's owner"""
+    schedule_invalidation(instance.user_id)
+
+
+for model in CACHED_MODELS:
+    post_save.connect(invalidate_owner, sender=model)
+    post_delete.connect(invalidate_owner, sender=model)
+
+
+@receiver(m2m_changed)
+def invalidate_relation_owner(sender, instance, action, **kwargs):
+    """Invalidate the cached responses when related objects change"""
+    if sender in CACHED_RELATIONS and action.startswith("post_"):
+        schedule_invalidation(instance.user_id)
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_new_user(sender, instance, created, **kwargs):
+    """Start new users without any previously cached responses"""
+    if created:
+        schedule_invalidation(instance.pk)
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search(sender, instance, update_fields, using, **kwargs):
+    """Rebuild the search vector of a recipe when its title changes"""
+    if update_fields is None or "title" in update_fields:
+        schedule_search_update([instance.pk], using)
+
+
+def update_named_recipes_search(sender, instance, using, created=False, **kwargs):
+    """Rebuild the search vector of the recipes using a renamed tag or ingredient"""
+    if not created:
+        schedule_search_update(instance.recipe_set.values_list("id", flat=True), using)
+
+
+for model in SEARCHED_MODELS:
+    post_save.connect(update_named_recipes_search, sender=model)
+    pre_delete.connect(update_named_recipes_search, sender=model)
+
+
+@receiver(m2m_changed)
+def update_related_recipes_search(
+    sender, instance, action, reverse, pk_set, using, **kwargs
+):
+    """Rebuild the search vector of recipes whose tags or ingredients change"""
+    if sender not in SEARCHED_RELATIONS:
+        return
+
+    if not reverse:
+        if action.startswith("post_"):
+            schedule_search_update([instance.pk], using)
+    elif action in ("post_add", "post_remove"):
+        schedule_search_update(pk_set, using)
+    elif action == "pre_clear":
+        schedule_search_update(instance.recipe_set.values_list("id", flat=True), using)
@@ -0,0 +1,104 @@
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from core.models import Recipe
+
+
+class BenchmarkCommandTests(TestCase):
+    def test_benchmark_recipebook_detail(self):
+        """Test the recipe book benchmark reports both plans and rolls back"""
+        out = StringIO()
+
+        call_command(
+            "benchmark", "recipebook_detail", sizes=[2, 5], repeat=1, stdout=out
+        )
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertFalse(Recipe.objects.exists())
+
+    @skipUnless(connection.vendor == "sqlite", "Small tables are seq scanned")
+    def test_benchmark_explain_indexes(self):
+        """Test the list endpoint queries are planned with indexes"""
+        out = StringIO()
+
+        call_command("benchmark", "explain_indexes", sizes=[50], stdout=out)
+
+        self.assertNotIn("FULL SCAN", out.getvalue())
+
+    def test_benchmark_recipe_filter(self):
+        out = StringIO()
+
+        call_command("benchmark", "recipe_filter", sizes=[20], repeat=1, stdout=out)
+
+        self.assertEqual(len(out.getvalue().splitlines()), 5)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_benchmark_list_readers(self):
+        """Test the reader benchmark checks its output matches the serializers"""
+        out = StringIO()
+
+        call_command("benchmark", "list_readers", sizes=[5], repeat=1, stdout=out)
+
+        self.assertEqual(len(out.getvalue().splitlines()), 3)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_benchmark_list_aggregation(self):
+        """Test the aggregation benchmark compares strategies per page size"""
+        out = StringIO()
+
+        call_command(
+            "benchmark", "list_aggregation", sizes=[2, 5], repeat=1, stdout=out
+        )
+
+        strategies = 3 if connection.vendor == "postgresql" else 2
+        self.assertEqual(len(out.getvalue().splitlines()), 1 + 2 * strategies)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_benchmark_json_render(self):
+        """Test the JSON benchmark checks both backends render the same bytes"""
+        out = StringIO()
+
+        call_command("benchmark", "json_render", sizes=[5], repeat=1, stdout=out)
+
+        self.assertEqual(len(out.getvalue().splitlines()), 3)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_benchmark_recipe_search(self):
+        out = StringIO()
+
+        call_command("benchmark", "recipe_search", sizes=[10], repeat=1, stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(lines[1].split()[3], "1")
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_benchmark_assigned_only(self):
+        out = StringIO()
+
+        call_command("benchmark", "assigned_only", sizes=[5], repeat=1, stdout=out)
+
+        rows = [line.split()[2] for line in out.getvalue().splitlines()[1:]]
+        self.assertEqual(rows, ["20", "20"])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_benchmark_autocomplete(self):
+        out = StringIO()
+
+        call_command("benchmark", "autocomplete", sizes=[5], repeat=1, stdout=out)
+
+        self.assertEqual(len(out.getvalue().splitlines()), 4)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_benchmark_export(self):
+        out = StringIO()
+
+        call_command("benchmark", "export", sizes=[5], repeat=1, stdout=out)
+
+        self.assertEqual(len(out.getvalue().splitlines()), 3)
+        self.assertFalse(Recipe.objects.exists())
@@ -9,6 +9,7 @@ from core.models import Ingredient
 from recipe.serializers import IngredientSerializer
 
 INGREDIENT_URL = reverse("recipe:ingredient-list")
+AUTOCOMPLETE_URL = reverse("recipe:ingredient-autocomplete")
 
 
 class PublicIngredientAPITests(TestCase):
@@ -38,7 +39,7 @@ class PrivateIngredientAPITests(TestCase):
         ingredients = Ingredient.objects.all().order_by("-name")
         serializer = IngredientSerializer(ingredients, many=True)
 
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_ingredients_limited_to_user(self):
         user2 = get_user_model().objects.create_user(
@@ -51,8 +52,8 @@ class PrivateIngredientAPITests(TestCase):
         res = self.client.get(INGREDIENT_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]["name"], ingredient.name)
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertEqual(res.data["results"][0]["name"], ingredient.name)
 
     def test_creating_ingredients_successful(self):
         payload = {"name": "Orange"}
@@ -69,3 +70,29 @@ class PrivateIngredientAPITests(TestCase):
         payload = {"name": ""}
         res = self.client.post(INGREDIENT_URL, payload)
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_autocomplete_ingredients(self):
+        """Test prefix matches come first, then names containing the text"""
+        for name in ("Salt", "Sea salt", "salmon", "Sugar"):
+            Ingredient.objects.create(user=self.user, name=name)
+        other = get_user_model().objects.create_user("nilo2@nilo.com", "123456")
+        Ingredient.objects.create(user=other, name="Salsa")
+
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": "sal"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        names = [ingredient["name"] for ingredient in res.data["results"]]
+        self.assertEqual(names, ["salmon", "Salt", "Sea salt"])
+
+    def test_autocomplete_ingredients_limit(self):
+        for name in ("Salt", "Sea salt", "salmon"):
+            Ingredient.objects.create(user=self.user, name=name)
+
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": "sal", "limit": 1})
+        self.assertEqual(len(res.data["results"]), 1)
+
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": "sal", "limit": 500})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(AUTOCOMPLETE_URL)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,144 @@
+from core.models import Recipe, recipe_image_variant_path
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from recipe.media import parse_range
+from rest_framework import status
+from rest_framework.test import APIClient
+
+IMAGE_CONTENT = bytes(range(256)) * 4
+
+
+def media_url(name):
+    return reverse("media", args=[name])
+
+
+class ParseRangeTests(TestCase):
+    def test_parse_range(self):
+        self.assertEqual(parse_range("bytes=0-9", 100), (0, 9))
+        self.assertEqual(parse_range("bytes=90-", 100), (90, 99))
+        self.assertEqual(parse_range("bytes=-10", 100), (90, 99))
+        self.assertEqual(parse_range("bytes=50-500", 100), (50, 99))
+
+    def test_parse_range_ignores_unsupported_headers(self):
+        self.assertIsNone(parse_range(None, 100))
+        self.assertIsNone(parse_range("bytes=0-1,5-6", 100))
+        self.assertIsNone(parse_range("items=0-1", 100))
+
+    def test_parse_range_unsatisfiable(self):
+        with self.assertRaises(ValueError):
+            parse_range("bytes=100-", 100)
+        with self.assertRaises(ValueError):
+            parse_range("bytes=9-1", 100)
+
+
+class RecipeMediaAPITests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user("nilo@gmail.com", "123456")
+        self.client.force_authenticate(self.user)
+
+        name = default_storage.save(
+            "upload/recipe/media-test.jpg", ContentFile(IMAGE_CONTENT)
+        )
+        self.addCleanup(default_storage.delete, name)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title="Sample", time_minutes=5, price=5.00, image=name
+        )
+
+    def test_owner_gets_image(self):
+        res = self.client.get(media_url(self.recipe.image.name))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(res.streaming_content), IMAGE_CONTENT)
+        self.assertEqual(res["Content-Type"], "image/jpeg")
+        self.assertEqual(res["Accept-Ranges"], "bytes")
+        self.assertIn("immutable", res["Cache-Control"])
+
+    def test_owner_gets_variant(self):
+        self.recipe.image_status = Recipe.IMAGE_READY
+        self.recipe.save()
+        name = recipe_image_variant_path(self.recipe.image.name, "thumbnail")
+        default_storage.save(name, ContentFile(b"variant"))
+        self.addCleanup(default_storage.delete, name)
+
+        res = self.client.get(media_url(name))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], "image/webp")
+
+    def test_pending_variant_not_found(self):
+        self.recipe.image_status = Recipe.IMAGE_PENDING
+        self.recipe.save()
+        name = recipe_image_variant_path(self.recipe.image.name, "thumbnail")
+
+        res = self.client.get(media_url(name))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_missing_variant_not_found(self):
+        self.recipe.image_status = Recipe.IMAGE_READY
+        self.recipe.save()
+        name = recipe_image_variant_path(self.recipe.image.name, "medium")
+
+        res = self.client.get(media_url(name))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_range_request(self):
+        res = self.client.get(
+            media_url(self.recipe.image.name), HTTP_RANGE="bytes=10-19"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b"".join(res.streaming_content), IMAGE_CONTENT[10:20])
+        self.assertEqual(res["Content-Range"], f"bytes 10-19/{len(IMAGE_CONTENT)}")
+
+    def test_unsatisfiable_range(self):
+        res = self.client.get(
+            media_url(self.recipe.image.name), HTTP_RANGE="bytes=5000-"
+        )
+
+        self.assertEqual(
+            res.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+        )
+
+    def test_other_user_image_not_found(self):
+        other = get_user_model().objects.create_user("other@gmail.com", "123456")
+        self.client.force_authenticate(other)
+
+        res = self.client.get(media_url(self.recipe.image.name))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_unknown_file_of_recipe_not_found(self):
+        res = self.client.get(media_url("upload/recipe/media-test.exe"))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_anonymous_access_unauthorized(self):
+        self.client.force_authenticate(None)
+
+        res = self.client.get(media_url(self.recipe.image.name))
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(
+        MEDIA_DELIVERY="x-accel-redirect", MEDIA_ACCEL_PREFIX="/protected/"
+    )
+    def test_accel_redirect_delivery(self):
+        res = self.client.get(media_url(self.recipe.image.name))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res["X-Accel-Redirect"], "/protected/" + self.recipe.image.name
+        )
+        self.assertEqual(res.content, b"")
+
+    @override_settings(MEDIA_DELIVERY="x-sendfile")
+    def test_sendfile_delivery(self):
+        res = self.client.get(media_url(self.recipe.image.name))
+
+        self.assertEqual(res["X-Sendfile"], self.recipe.image.path)
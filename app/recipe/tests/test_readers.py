@@ -0,0 +1,117 @@
+from decimal import Decimal
+from unittest import skipUnless
+
+from core.models import Ingredient, Recipe, RecipeBook, Tag
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Prefetch
+from django.test.utils import CaptureQueriesContext
+from django.test import TestCase
+from recipe import serializers
+from recipe.readers import ListReader
+from recipe.views import RECIPE_RELATIONS
+from rest_framework.renderers import JSONRenderer
+
+
+class ListReaderParityTests(TestCase):
+    """The reader must render exactly what the serializers render"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("nilo@gmail.com", "123456")
+        tags = [Tag.objects.create(user=self.user, name=f"Tag {i}") for i in range(3)]
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name=f"Ingredient {i}")
+            for i in range(3)
+        ]
+
+        self.recipes = [
+            Recipe.objects.create(
+                user=self.user,
+                title="Cheesecake",
+                time_minutes=30,
+                price=Decimal("5.5"),
+                link="https://example.com",
+            ),
+            Recipe.objects.create(
+                user=self.user, title="Toast", time_minutes=2, price=Decimal("0.10")
+            ),
+            Recipe.objects.create(
+                user=self.user, title="Water", time_minutes=0, price=0
+            ),
+        ]
+        self.recipes[0].tags.add(tags[2], tags[0])
+        self.recipes[0].ingredients.add(ingredients[1])
+        self.recipes[1].tags.add(tags[1])
+        self.recipes[1].ingredients.add(ingredients[2], ingredients[0])
+
+        book = RecipeBook.objects.create(user=self.user, title="Book")
+        book.recipes.add(self.recipes[2], self.recipes[0])
+        RecipeBook.objects.create(user=self.user, title="Empty")
+
+    def assert_parity(self, serializer_class, queryset, fields=None, **options):
+        reader = ListReader(serializer_class, fields, **options)
+        data = reader.represent(list(reader.get_queryset(queryset)))
+
+        context = {"selected_fields": fields}
+        expected = serializer_class(queryset, many=True, context=context).data
+
+        self.assertEqual(data, expected)
+        self.assertEqual(JSONRenderer().render(data), JSONRenderer().render(expected))
+
+    def test_recipe_parity(self):
+        queryset = Recipe.objects.order_by("-id")
+
+        self.assert_parity(
+            serializers.RecipeSerializer,
+            queryset.prefetch_related(*RECIPE_RELATIONS),
+        )
+
+    @skipUnless(connection.vendor == "postgresql", "ARRAY() is PostgreSQL only")
+    def test_recipe_parity_with_aggregated_ids(self):
+        self.assert_parity(
+            serializers.RecipeSerializer,
+            Recipe.objects.order_by("-id").prefetch_related(*RECIPE_RELATIONS),
+            aggregate=True,
+        )
+
+    def test_recipe_parity_with_batched_ids(self):
+        self.assert_parity(
+            serializers.RecipeSerializer,
+            Recipe.objects.order_by("-id").prefetch_related(*RECIPE_RELATIONS),
+            aggregate=False,
+        )
+
+    def test_related_ids_are_aggregated_on_postgresql(self):
+        """Test relation ids are read by the row query where supported"""
+        reader = ListReader(serializers.RecipeSerializer)
+
+        with CaptureQueriesContext(connection) as ctx:
+            reader.represent(list(reader.get_queryset(Recipe.objects.all())))
+
+        expected = 1 if connection.vendor == "postgresql" else 3
+        self.assertEqual(len(ctx.captured_queries), expected)
+
+    def test_recipe_sparse_parity(self):
+        self.assert_parity(
+            serializers.RecipeSerializer,
+            Recipe.objects.order_by("-id"),
+            fields=["id", "title", "price"],
+        )
+
+    def test_recipe_book_parity(self):
+        self.assert_parity(
+            serializers.RecipeBookSerializer,
+            RecipeBook.objects.order_by("-id").prefetch_related(
+                Prefetch("recipes", queryset=Recipe.objects.order_by("id"))
+            ),
+        )
+
+    def test_tag_and_ingredient_parity(self):
+        self.assert_parity(serializers.TagSerializer, Tag.objects.order_by("-name"))
+        self.assert_parity(
+            serializers.IngredientSerializer, Ingredient.objects.order_by("-name")
+        )
+
+    def test_nested_serializer_is_not_supported(self):
+        with self.assertRaises(TypeError):
+            ListReader(serializers.RecipeDetailSerializer)
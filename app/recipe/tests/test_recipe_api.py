@@ -1,16 +1,27 @@
+import json
 import os
 import tempfile
+from unittest import skipUnless
+from unittest.mock import patch
 
 from PIL import Image
-from core.models import Recipe, Tag, Ingredient
+from core.models import Recipe, Tag, Ingredient, recipe_image_variant_path
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from recipe.images import VARIANTS, delete_image, process_recipe_image
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
+from recipe.uploads import HEADER_BYTES
+from recipe.views import RecipeViewSet
 from rest_framework import status
 from rest_framework.test import APIClient
 
 RECIPE_URL = reverse("recipe:recipe-list")
+RECIPE_BULK_URL = reverse("recipe:recipe-bulk")
+RECIPE_EXPORT_URL = reverse("recipe:recipe-export")
 
 
 def image_upload_url(recipe_id):
@@ -22,11 +33,11 @@ def detail_url(recipe_id):
 
 
 def create_sample_tag(user, name="sample tag"):
-    return Tag.objects.create(user=user, name=name)
+    return Tag.objects.get_or_create(user=user, name=name)[0]
 
 
 def create_sample_ingredient(user, name="sample ingredient"):
-    return Ingredient.objects.create(user=user, name=name)
+    return Ingredient.objects.get_or_create(user=user, name=name)[0]
 
 
 def create_sample_recipe(user, **kwargs):
@@ -61,7 +72,7 @@ class PrivateRecipeAPITests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_recipes_limited_to_user(self):
         user2 = get_user_model().objects.create_user("other@gmail.com", "1234567")
@@ -74,8 +85,8 @@ class PrivateRecipeAPITests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_view_recipe_detail(self):
         recipe = create_sample_recipe(self.user)
@@ -88,6 +99,161 @@ class PrivateRecipeAPITests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, serializer.data)
 
+    def test_recipes_are_paginated_by_cursor(self):
+        """Test walking every page returns each recipe once, newest first"""
+        recipes = [create_sample_recipe(self.user, title=f"R{i}") for i in range(5)]
+
+        ids = []
+        url = RECIPE_URL + "?page_size=2"
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(res.data["results"]), 2)
+            ids += [recipe["id"] for recipe in res.data["results"]]
+            url = res.data["next"]
+
+        self.assertEqual(ids, [recipe.id for recipe in reversed(recipes)])
+
+    def test_recipes_page_size_is_capped(self):
+        """Test clients cannot request pages beyond the server cap"""
+        paginator = RecipeViewSet.pagination_class
+
+        for i in range(paginator.max_page_size + 1):
+            create_sample_recipe(self.user, title=f"R{i}")
+
+        res = self.client.get(RECIPE_URL, {"page_size": 10000})
+
+        self.assertEqual(len(res.data["results"]), paginator.max_page_size)
+        self.assertIsNotNone(res.data["next"])
+
+    def _create_tagged_recipes(self):
+        vegan = create_sample_tag(user=self.user, name="Vegan")
+        dessert = create_sample_tag(user=self.user, name="Dessert")
+        both = create_sample_recipe(self.user, title="Vegan cake")
+        both.tags.add(vegan, dessert)
+        only_vegan = create_sample_recipe(self.user, title="Salad")
+        only_vegan.tags.add(vegan)
+        create_sample_recipe(self.user, title="Steak")
+
+        return vegan, dessert, both, only_vegan
+
+    def test_filter_recipes_matching_any_tag_are_unique(self):
+        vegan, dessert, both, only_vegan = self._create_tagged_recipes()
+
+        res = self.client.get(RECIPE_URL, {"tags": f"{vegan.id},{dessert.id}"})
+
+        ids = [recipe["id"] for recipe in res.data["results"]]
+        self.assertEqual(ids, [only_vegan.id, both.id])
+
+    def test_filter_recipes_matching_all_tags(self):
+        vegan, dessert, both, _ = self._create_tagged_recipes()
+
+        res = self.client.get(
+            RECIPE_URL, {"tags": f"{vegan.id},{dessert.id}", "match": "all"}
+        )
+
+        ids = [recipe["id"] for recipe in res.data["results"]]
+        self.assertEqual(ids, [both.id])
+
+    def test_filter_recipes_matching_all_tags_and_ingredients(self):
+        vegan, dessert, both, only_vegan = self._create_tagged_recipes()
+        flour = create_sample_ingredient(user=self.user, name="Flour")
+        only_vegan.ingredients.add(flour)
+
+        res = self.client.get(
+            RECIPE_URL, {"tags": str(vegan.id), "ingredients": str(flour.id)}
+        )
+
+        ids = [recipe["id"] for recipe in res.data["results"]]
+        self.assertEqual(ids, [only_vegan.id])
+
+    def test_filter_recipes_with_invalid_params_fails(self):
+        for params in ({"tags": "1,abc"}, {"tags": "1", "match": "some"}):
+            res = self.client.get(RECIPE_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def _count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return len(ctx.captured_queries)
+
+    def _create_related_recipes(self, count):
+        for i in range(count):
+            recipe = create_sample_recipe(self.user, title=f"Recipe {i}")
+            recipe.tags.add(create_sample_tag(user=self.user, name=f"Tag {i}"))
+            recipe.ingredients.add(
+                create_sample_ingredient(user=self.user, name=f"Ingredient {i}")
+            )
+
+    def test_list_recipes_query_count_is_constant(self):
+        """Test listing recipes does not issue queries per recipe"""
+        self._create_related_recipes(2)
+        few = self._count_queries(RECIPE_URL)
+
+        self._create_related_recipes(10)
+        many = self._count_queries(RECIPE_URL)
+
+        self.assertEqual(few, many)
+
+    def test_view_recipe_detail_query_count_is_constant(self):
+        """Test retrieving a recipe does not issue queries per relation"""
+        recipe = create_sample_recipe(self.user)
+        recipe.tags.add(create_sample_tag(user=self.user))
+        few = self._count_queries(detail_url(recipe.id))
+
+        for i in range(10):
+            recipe.tags.add(create_sample_tag(user=self.user, name=f"Tag {i}"))
+            recipe.ingredients.add(
+                create_sample_ingredient(user=self.user, name=f"Ingredient {i}")
+            )
+        many = self._count_queries(detail_url(recipe.id))
+
+        self.assertEqual(few, many)
+
+    def test_list_recipes_with_sparse_fields(self):
+        """Test listing only the requested fields skips unused columns and joins"""
+        self._create_related_recipes(3)
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPE_URL, {"fields": "id,title,time_minutes"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        for recipe in res.data["results"]:
+            self.assertEqual(list(recipe), ["id", "title", "time_minutes"])
+        sql = " ".join(query["sql"] for query in ctx.captured_queries)
+        self.assertNotIn('"price"', sql)
+        self.assertNotIn("core_recipe_tags", sql)
+
+    def test_retrieve_recipe_omitting_fields(self):
+        """Test omitting fields from the recipe detail"""
+        recipe = create_sample_recipe(self.user)
+
+        res = self.client.get(detail_url(recipe.id), {"omit": "tags,ingredients"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn("tags", res.data)
+        self.assertNotIn("ingredients", res.data)
+        self.assertIn("image_variants", res.data)
+        self.assertEqual(res.data["title"], recipe.title)
+
+    def test_sparse_fields_unknown_field_fails(self):
+        """Test selecting a field the serializer does not have fails"""
+        res = self.client.get(RECIPE_URL, {"fields": "id,secret"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data["fields"], ["Unknown fields: secret."])
+
+    def test_sparse_fields_selecting_nothing_fails(self):
+        """Test an empty selection is rejected instead of rendering {} items"""
+        for params in ({"fields": ""}, {"fields": ","}, {"fields": "id", "omit": "id"}):
+            res = self.client.get(RECIPE_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST, params)
+            self.assertIn("fields", res.data)
+
     def test_create_basic_recipe(self):
         payload = {"title": "chocolate chessecake", "time_minutes": 30, "price": 5.50}
 
@@ -143,6 +309,56 @@ class PrivateRecipeAPITests(TestCase):
         self.assertIn(ing1, ingredients)
         self.assertIn(ing2, ingredients)
 
+    def test_create_recipe_with_other_users_tag_fails(self):
+        user2 = get_user_model().objects.create_user("other@gmail.com", "1234567")
+        tag = create_sample_tag(user=user2)
+        payload = {"title": "Curry", "tags": [tag.id], "time_minutes": 5, "price": 5}
+
+        res = self.client.post(RECIPE_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_create_recipe_reports_each_missing_id(self):
+        tag = create_sample_tag(user=self.user)
+        payload = {
+            "title": "Curry",
+            "tags": [tag.id, 9998, 9999],
+            "time_minutes": 5,
+            "price": 5,
+        }
+
+        res = self.client.post(RECIPE_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(res.data["tags"]), 2)
+        self.assertIn("9998", res.data["tags"][0])
+        self.assertIn("9999", res.data["tags"][1])
+
+    def test_create_recipe_query_count_is_constant(self):
+        """Test submitted related ids are validated in a single query"""
+
+        def create(count):
+            tags = [create_sample_tag(self.user, f"T{count}-{i}") for i in range(count)]
+            ingredients = [
+                create_sample_ingredient(self.user, f"I{count}-{i}")
+                for i in range(count)
+            ]
+            payload = {
+                "title": "Stew",
+                "tags": [tag.id for tag in tags],
+                "ingredients": [ingredient.id for ingredient in ingredients],
+                "time_minutes": 5,
+                "price": 5,
+            }
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.post(RECIPE_URL, payload)
+
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(create(2), create(20))
+
     def test_recipe_partial_update(self):
         """Test update recipe with PATCH"""
         recipe = create_sample_recipe(user=self.user, price=2)
@@ -177,6 +393,193 @@ class PrivateRecipeAPITests(TestCase):
         self.assertEqual(len(tags), 0)
 
 
+class CachedRecipeAPITests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user("nilo@gmail.com", "123456")
+        self.client.force_authenticate(self.user)
+
+    def test_repeated_list_is_served_from_cache(self):
+        create_sample_recipe(self.user)
+        first = self.client.get(RECIPE_URL)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(RECIPE_URL)
+
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(first["ETag"], second["ETag"])
+        self.assertIn("Last-Modified", second)
+
+    def test_matching_etag_returns_not_modified(self):
+        create_sample_recipe(self.user)
+        etag = self.client.get(RECIPE_URL)["ETag"]
+
+        with self.assertNumQueries(0):
+            res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res["ETag"], etag)
+        self.assertEqual(res.content, b"")
+
+    def test_creating_recipe_invalidates_list(self):
+        create_sample_recipe(self.user)
+        etag = self.client.get(RECIPE_URL)["ETag"]
+
+        create_sample_recipe(self.user, title="Second")
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["results"]), 2)
+        self.assertNotEqual(res["ETag"], etag)
+
+    def test_weak_etag_returns_not_modified(self):
+        create_sample_recipe(self.user)
+        etag = self.client.get(RECIPE_URL)["ETag"]
+
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=f"W/{etag}")
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_creating_recipe_in_same_second_changes_last_modified(self):
+        create_sample_recipe(self.user)
+        last_modified = self.client.get(RECIPE_URL)["Last-Modified"]
+
+        create_sample_recipe(self.user, title="Second")
+        res = self.client.get(RECIPE_URL, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["results"]), 2)
+        self.assertNotEqual(res["Last-Modified"], last_modified)
+
+    def test_renaming_tag_invalidates_detail(self):
+        recipe = create_sample_recipe(self.user)
+        tag = create_sample_tag(self.user, name="Vegn")
+        recipe.tags.add(tag)
+        self.client.get(detail_url(recipe.id))
+
+        tag.name = "Vegan"
+        tag.save()
+        res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.data["tags"][0]["name"], "Vegan")
+
+    def test_cache_is_per_user(self):
+        create_sample_recipe(self.user)
+        self.client.get(RECIPE_URL)
+
+        user2 = get_user_model().objects.create_user("other@gmail.com", "1234567")
+        self.client.force_authenticate(user2)
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.data["results"], [])
+
+
+class BulkRecipeAPITests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user("nilo@gmail.com", "123456")
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_recipes(self):
+        tag = create_sample_tag(user=self.user)
+        ingredient = create_sample_ingredient(user=self.user)
+        payload = [
+            {
+                "title": f"Recipe {i}",
+                "tags": [tag.id],
+                "ingredients": [ingredient.id],
+                "time_minutes": 10,
+                "price": "5.00",
+            }
+            for i in range(3)
+        ]
+
+        res = self.client.post(RECIPE_BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 3)
+        recipes = Recipe.objects.filter(user=self.user)
+        self.assertEqual(recipes.count(), 3)
+        for recipe in recipes:
+            self.assertEqual(list(recipe.tags.all()), [tag])
+            self.assertEqual(list(recipe.ingredients.all()), [ingredient])
+
+    def test_bulk_create_reports_errors_per_item(self):
+        item = {"time_minutes": 10, "price": "5.00", "ingredients": [], "tags": []}
+        payload = [
+            dict(item, title="Valid"),
+            dict(item, title="Invalid", tags=[9999]),
+        ]
+
+        res = self.client.post(RECIPE_BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn("tags", res.data[1])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_create_requires_a_list(self):
+        payload = {"title": "Single", "time_minutes": 10, "price": "5.00"}
+
+        res = self.client.post(RECIPE_BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_create_query_count_is_constant(self):
+        """Test related ids of every item are validated together"""
+        tag = create_sample_tag(user=self.user)
+
+        def create(count):
+            payload = [
+                {
+                    "title": "R",
+                    "tags": [tag.id],
+                    "ingredients": [],
+                    "time_minutes": 1,
+                    "price": "1.00",
+                }
+                for _ in range(count)
+            ]
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.post(RECIPE_BULK_URL, payload, format="json")
+
+            return [q["sql"] for q in ctx.captured_queries if "core_tag" in q["sql"]]
+
+        self.assertEqual(len(create(2)), len(create(10)))
+
+    def test_bulk_partial_update_recipes(self):
+        recipe1 = create_sample_recipe(user=self.user, title="Old 1")
+        recipe2 = create_sample_recipe(user=self.user, title="Old 2")
+        recipe2.tags.add(create_sample_tag(user=self.user))
+        new_tag = create_sample_tag(user=self.user, name="Curry")
+        payload = [
+            {"id": recipe1.id, "title": "New 1"},
+            {"id": recipe2.id, "tags": [new_tag.id]},
+        ]
+
+        res = self.client.patch(RECIPE_BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe1.refresh_from_db()
+        recipe2.refresh_from_db()
+        self.assertEqual(recipe1.title, "New 1")
+        self.assertEqual(recipe2.title, "Old 2")
+        self.assertEqual(list(recipe2.tags.all()), [new_tag])
+
+    def test_bulk_partial_update_other_users_recipe_fails(self):
+        user2 = get_user_model().objects.create_user("other@gmail.com", "1234567")
+        recipe = create_sample_recipe(user=user2, title="Theirs")
+        payload = [{"id": recipe.id, "title": "Mine"}, {"title": "No id"}]
+
+        res = self.client.patch(RECIPE_BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("id", res.data[0])
+        self.assertIn("id", res.data[1])
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, "Theirs")
+
+
 class RecipeImageUploadAPITests(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -185,7 +588,9 @@ class RecipeImageUploadAPITests(TestCase):
         self.recipe = create_sample_recipe(user=self.user)
 
     def tearDown(self):
-        self.recipe.image.delete()
+        self.recipe.refresh_from_db()
+        if self.recipe.image:
+            delete_image(self.recipe.image.name)
 
     def test_upload_image_to_recipe(self):
         url = image_upload_url(self.recipe.id)
@@ -202,6 +607,133 @@ class RecipeImageUploadAPITests(TestCase):
         self.assertIn("image", res.data)
         self.assertTrue(os.path.exists(self.recipe.image.path))
 
+    @patch("recipe.images.schedule_variants")
+    def test_upload_image_schedules_variants(self, schedule_variants):
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix=".jpg") as ntf:
+            Image.new("RGB", (10, 10)).save(ntf, format="JPEG")
+            ntf.seek(0)
+
+            res = self.client.post(url, {"image": ntf}, format="multipart")
+
+        self.assertEqual(res.data["image_status"], Recipe.IMAGE_PENDING)
+        self.assertEqual(res.data["image_variants"], {})
+        schedule_variants.assert_called_once()
+
+    def _upload_image(self, image, **save_kwargs):
+        with tempfile.NamedTemporaryFile(suffix=".jpg") as ntf:
+            image.save(ntf, format="JPEG", **save_kwargs)
+            ntf.seek(0)
+            self.client.post(
+                image_upload_url(self.recipe.id), {"image": ntf}, format="multipart"
+            )
+
+        self.recipe.refresh_from_db()
+
+    def test_process_image_creates_variants_without_exif(self):
+        image = Image.new("RGB", (1200, 800))
+        exif = image.getexif()
+        exif[0x010F] = "Camera maker"
+        self._upload_image(image, exif=exif)
+        uploaded = self.recipe.image.path
+
+        result = process_recipe_image(self.recipe.id, self.recipe.image.name)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(result, Recipe.IMAGE_READY)
+        self.assertNotEqual(self.recipe.image.path, uploaded)
+        self.assertFalse(os.path.exists(uploaded))
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_READY)
+        for variant, size in VARIANTS.items():
+            name = recipe_image_variant_path(self.recipe.image.name, variant)
+            with Image.open(self.recipe.image.storage.path(name)) as variant_image:
+                self.assertEqual(variant_image.format, "WEBP")
+                self.assertLessEqual(variant_image.size, size)
+        with Image.open(self.recipe.image.path) as original:
+            self.assertNotIn("exif", original.info)
+
+        res = self.client.get(detail_url(self.recipe.id))
+        self.assertEqual(set(res.data["image_variants"]), set(VARIANTS))
+
+    def test_process_invalid_image_fails(self):
+        self._upload_image(Image.new("RGB", (10, 10)))
+        with open(self.recipe.image.path, "wb") as image_file:
+            image_file.write(b"not an image")
+
+        with self.assertLogs("recipe.images", "ERROR"):
+            result = process_recipe_image(self.recipe.id, self.recipe.image.name)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(result, Recipe.IMAGE_FAILED)
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_FAILED)
+
+    @patch("recipe.images.Image.open", side_effect=Image.DecompressionBombError)
+    def test_process_image_fails_on_any_error(self, open_image):
+        self._upload_image(Image.new("RGB", (10, 10)))
+
+        with self.assertLogs("recipe.images", "ERROR"):
+            result = process_recipe_image(self.recipe.id, self.recipe.image.name)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(result, Recipe.IMAGE_FAILED)
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_FAILED)
+
+    @patch("recipe.images.schedule_delete", side_effect=delete_image)
+    def test_upload_new_image_deletes_previous_one(self, schedule_delete):
+        self._upload_image(Image.new("RGB", (10, 10)))
+        process_recipe_image(self.recipe.id, self.recipe.image.name)
+        self.recipe.refresh_from_db()
+        previous = [self.recipe.image.path] + [
+            self.recipe.image.storage.path(
+                recipe_image_variant_path(self.recipe.image.name, variant)
+            )
+            for variant in VARIANTS
+        ]
+        self.assertTrue(all(os.path.exists(path) for path in previous))
+
+        self._upload_image(Image.new("RGB", (20, 20)))
+
+        self.assertTrue(os.path.exists(self.recipe.image.path))
+        self.assertFalse(any(os.path.exists(path) for path in previous))
+
+    @override_settings(RECIPE_IMAGE_MAX_PIXELS=50)
+    def test_upload_image_with_too_many_pixels_bad_request(self):
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix=".jpg") as ntf:
+            Image.new("RGB", (10, 10)).save(ntf, format="JPEG")
+            ntf.seek(0)
+
+            res = self.client.post(url, {"image": ntf}, format="multipart")
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data["image"], ["Image has too many pixels."])
+        self.assertFalse(self.recipe.image)
+
+    @override_settings(RECIPE_IMAGE_MAX_BYTES=100)
+    def test_upload_too_large_image_bad_request(self):
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix=".jpg") as ntf:
+            Image.new("RGB", (100, 100)).save(ntf, format="JPEG")
+            ntf.seek(0)
+
+            res = self.client.post(url, {"image": ntf}, format="multipart")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data["image"], ["Image file is too large."])
+
+    @override_settings(RECIPE_IMAGE_MAX_BYTES=100)
+    def test_upload_over_content_length_limit_bad_request(self):
+        url = image_upload_url(self.recipe.id)
+        image = SimpleUploadedFile("big.jpg", b"x" * (HEADER_BYTES + 200))
+
+        res = self.client.post(url, {"image": image}, format="multipart")
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data["image"], ["Image file is too large."])
+        self.assertFalse(self.recipe.image)
+
     def test_upload_invalid_image_bad_request(self):
         url = image_upload_url(self.recipe.id)
         res = self.client.post(url, {"image": "not a image"}, format="multipart")
@@ -222,9 +754,9 @@ class RecipeImageUploadAPITests(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data["results"])
+        self.assertIn(serializer2.data, res.data["results"])
+        self.assertNotIn(serializer3.data, res.data["results"])
 
     def test_filter_recipes_by_ingredients(self):
         recipe1 = create_sample_recipe(user=self.user, title="thai")
@@ -241,6 +773,303 @@ class RecipeImageUploadAPITests(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data["results"])
+        self.assertIn(serializer2.data, res.data["results"])
+        self.assertNotIn(serializer3.data, res.data["results"])
+
+
+class SearchRecipeAPITests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user("nilo@gmail.com", "123456")
+        self.client.force_authenticate(self.user)
+
+        self.cake = create_sample_recipe(self.user, title="Chocolate cake")
+        self.mousse = create_sample_recipe(self.user, title="Mousse")
+        self.mousse.ingredients.add(create_sample_ingredient(self.user, "Chocolate"))
+        self.salad = create_sample_recipe(self.user, title="Green salad")
+        self.salad.tags.add(create_sample_tag(self.user, "Vegan"))
+
+    def search(self, text, **params):
+        res = self.client.get(RECIPE_URL, {"search": text, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return [recipe["id"] for recipe in res.data["results"]]
+
+    def test_search_matches_title_tags_and_ingredients(self):
+        """Test search finds recipes by title, tag name or ingredient name"""
+        self.assertEqual(self.search("salad"), [self.salad.id])
+        self.assertEqual(self.search("vegan"), [self.salad.id])
+        self.assertEqual(self.search("chocolate"), [self.cake.id, self.mousse.id])
+
+    def test_search_ranks_title_matches_first(self):
+        cookies = create_sample_recipe(self.user, title="Cookies")
+        cookies.ingredients.add(create_sample_ingredient(self.user, "Cake flour"))
+
+        self.assertEqual(self.search("cake"), [self.cake.id, cookies.id])
+
+    def test_search_requires_every_word(self):
+        self.assertEqual(self.search("chocolate mousse"), [self.mousse.id])
+
+    def test_search_is_limited_to_user(self):
+        other = get_user_model().objects.create_user("other@gmail.com", "123456")
+        create_sample_recipe(other, title="Green salad")
+
+        self.assertEqual(self.search("salad"), [self.salad.id])
+
+    def test_search_combines_with_filters(self):
+        tag = create_sample_tag(self.user, "Dessert")
+        self.mousse.tags.add(tag)
+
+        self.assertEqual(self.search("chocolate", tags=tag.id), [self.mousse.id])
+
+    def test_search_returns_a_single_ranked_page(self):
+        """Test search returns the best page_size results without more pages"""
+        res = self.client.get(RECIPE_URL, {"search": "chocolate", "page_size": 1})
+
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertIsNone(res.data["next"])
+        self.assertIsNone(res.data["previous"])
+
+    @patch("recipe.views.schedule_search_update")
+    def test_bulk_create_schedules_search_update(self, schedule_search_update):
+        payload = [{"title": "Lemon tart", "time_minutes": 5, "price": "2.00"}]
+
+        res = self.client.post(RECIPE_BULK_URL, payload, format="json")
+
+        schedule_search_update.assert_called_once_with([res.data[0]["id"]], "default")
+
+    def test_search_with_sparse_fields(self):
+        res = self.client.get(RECIPE_URL, {"search": "salad", "fields": "title"})
+
+        self.assertEqual(res.data["results"], [{"title": "Green salad"}])
+
+
+@skipUnless(connection.vendor == "postgresql", "Search vectors are PostgreSQL only")
+class SearchVectorTests(TransactionTestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user("nilo@gmail.com", "123456")
+        self.client.force_authenticate(self.user)
+
+    def search(self, text):
+        res = self.client.get(RECIPE_URL, {"search": text})
+
+        return [recipe["id"] for recipe in res.data["results"]]
+
+    def test_search_vector_follows_changes(self):
+        """Test renamed titles, tags and ingredients are searchable"""
+        recipe = create_sample_recipe(self.user, title="Pancakes")
+        tag = create_sample_tag(self.user, "Breakfast")
+        recipe.tags.add(tag)
+        self.assertEqual(self.search("breakfast"), [recipe.id])
+
+        tag.name = "Brunch"
+        tag.save()
+        self.assertEqual(self.search("brunch"), [recipe.id])
+        self.assertEqual(self.search("breakfast"), [])
+
+        recipe.title = "Waffles"
+        recipe.save()
+        self.assertEqual(self.search("waffles"), [recipe.id])
+
+        tag.delete()
+        self.assertEqual(self.search("brunch"), [])
+
+    def test_bulk_saved_recipes_are_searchable(self):
+        payload = [
+            {"title": "Lemon tart", "time_minutes": 5, "price": "2.00"},
+            {"title": "Apple pie", "time_minutes": 5, "price": "2.00"},
+        ]
+        res = self.client.post(RECIPE_BULK_URL, payload, format="json")
+        tart, pie = [recipe["id"] for recipe in res.data]
+        self.assertEqual(self.search("tart"), [tart])
+
+        payload = [{"id": pie, "title": "Apple crumble", "tag_names": ["Autumn"]}]
+        self.client.patch(RECIPE_BULK_URL, payload, format="json")
+        self.assertEqual(self.search("crumble autumn"), [pie])
+
+        tag = Tag.objects.get(user=self.user, name="Autumn")
+        payload = [{"id": tag.id, "name": "Fall"}]
+        self.client.patch(reverse("recipe:tag-bulk"), payload, format="json")
+        self.assertEqual(self.search("fall"), [pie])
+
+    def test_search_tolerates_typos_in_titles(self):
+        recipe = create_sample_recipe(self.user, title="Spaghetti carbonara")
+
+        self.assertEqual(self.search("spagheti carbonara"), [recipe.id])
+
+
+class NamedRelationsRecipeAPITests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user("nilo@gmail.com", "123456")
+        self.client.force_authenticate(self.user)
+
+    def test_create_recipe_with_tag_and_ingredient_names(self):
+        """Test names resolve to existing objects and create the missing ones"""
+        vegan = create_sample_tag(self.user, "Vegan")
+        other = get_user_model().objects.create_user("other@gmail.com", "123456")
+        create_sample_tag(other, "Dessert")
+        payload = {
+            "title": "Sorbet",
+            "time_minutes": 5,
+            "price": "2.00",
+            "tag_names": ["Vegan", "Dessert", "Vegan"],
+            "ingredient_names": ["Lemon"],
+        }
+
+        res = self.client.post(RECIPE_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn("tag_names", res.data)
+        recipe = Recipe.objects.get(id=res.data["id"])
+        dessert = Tag.objects.get(user=self.user, name="Dessert")
+        self.assertEqual(res.data["tags"], [vegan.id, dessert.id])
+        self.assertEqual(set(recipe.tags.all()), {vegan, dessert})
+        self.assertEqual(
+            list(recipe.ingredients.values_list("name", flat=True)), ["Lemon"]
+        )
+
+    def test_update_recipe_with_ids_and_names(self):
+        recipe = create_sample_recipe(self.user)
+        recipe.tags.add(create_sample_tag(self.user, "Old"))
+        vegan = create_sample_tag(self.user, "Vegan")
+
+        res = self.client.patch(
+            detail_url(recipe.id),
+            {"tags": [vegan.id], "tag_names": ["Quick"]},
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            set(recipe.tags.values_list("name", flat=True)), {"Vegan", "Quick"}
+        )
+
+    def test_create_recipe_inserts_relations_once_per_through_table(self):
+        payload = {
+            "title": "Sorbet",
+            "time_minutes": 5,
+            "price": "2.00",
+            "tag_names": ["Vegan", "Dessert", "Quick"],
+            "ingredient_names": ["Lemon", "Sugar"],
+        }
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post(RECIPE_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        for table in ("core_recipe_tags", "core_recipe_ingredients"):
+            writes = [
+                q["sql"]
+                for q in ctx.captured_queries
+                if f'"{table}"' in q["sql"] and not q["sql"].startswith("SELECT")
+            ]
+            self.assertEqual(len(writes), 1)
+            self.assertTrue(writes[0].startswith(f'INSERT INTO "{table}"'))
+
+    def test_create_recipe_with_blank_name_fails(self):
+        payload = {"title": "R", "time_minutes": 1, "price": 1, "tag_names": [""]}
+
+        res = self.client.post(RECIPE_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Tag.objects.exists())
+
+    def test_bulk_create_with_names_query_count_is_constant(self):
+        """Test the names of every item are resolved and created together"""
+
+        def create(count):
+            payload = [
+                {
+                    "title": f"R{i}",
+                    "time_minutes": 1,
+                    "price": "1.00",
+                    "tag_names": [f"T{count}-{i}", "Shared"],
+                    "ingredient_names": [f"I{count}-{i}"],
+                }
+                for i in range(count)
+            ]
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.post(RECIPE_BULK_URL, payload, format="json")
+
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(len(res.data[0]["tags"]), 2)
+            return [
+                q["sql"]
+                for q in ctx.captured_queries
+                if '"core_tag"' in q["sql"] or '"core_ingredient"' in q["sql"]
+            ]
+
+        self.assertEqual(len(create(2)), len(create(10)))
+        self.assertEqual(Tag.objects.filter(name="Shared").count(), 1)
+
+
+class ExportRecipeAPITests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user("nilo@gmail.com", "123456")
+        self.client.force_authenticate(self.user)
+
+    def export(self, **params):
+        res = self.client.get(RECIPE_EXPORT_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+
+        return res, b"".join(res.streaming_content).decode()
+
+    def test_export_recipes_as_ndjson(self):
+        """Test every recipe is streamed as a line of the list representation"""
+        recipes = [create_sample_recipe(self.user, title=f"R{i}") for i in range(3)]
+        recipes[0].tags.add(create_sample_tag(self.user))
+        other = get_user_model().objects.create_user("other@gmail.com", "123456")
+        create_sample_recipe(other)
+
+        res, body = self.export()
+
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+        self.assertIn('filename="recipes.ndjson"', res["Content-Disposition"])
+        expected = RecipeSerializer(reversed(recipes), many=True).data
+        self.assertEqual([json.loads(line) for line in body.splitlines()], expected)
+
+    def test_export_recipes_as_csv(self):
+        recipe = create_sample_recipe(self.user, title="Soup, hot")
+        recipe.ingredients.add(
+            create_sample_ingredient(self.user, "Leek"),
+            create_sample_ingredient(self.user, "Potato"),
+        )
+        ids = ",".join(
+            str(pk) for pk in recipe.ingredients.values_list("id", flat=True)
+        )
+
+        res, body = self.export(format="csv", fields="title,ingredients")
+
+        self.assertEqual(res["Content-Type"], "text/csv; charset=utf-8")
+        self.assertEqual(
+            body.splitlines(), ["title,ingredients", f'"Soup, hot","{ids}"']
+        )
+
+    def test_export_without_recipes_has_only_the_header(self):
+        _, body = self.export(format="csv", fields="id")
+
+        self.assertEqual(body, "id\r\n")
+
+    def test_export_reads_recipes_in_chunks(self):
+        """Test related ids are read per chunk of recipes, not per recipe"""
+
+        def count_queries(total):
+            for i in range(total):
+                recipe = create_sample_recipe(self.user, title=f"R{i}")
+                recipe.tags.add(create_sample_tag(self.user, f"T{i}"))
+            with CaptureQueriesContext(connection) as ctx:
+                _, body = self.export()
+            self.assertEqual(len(body.splitlines()), Recipe.objects.count())
+
+            return len(ctx.captured_queries)
+
+        with patch.object(RecipeViewSet, "export_chunk_size", 5):
+            few = count_queries(5)
+            more = count_queries(5)
+
+        self.assertEqual(more - few, 1 if connection.vendor == "postgresql" else 2)
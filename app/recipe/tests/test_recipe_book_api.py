@@ -1,14 +1,26 @@
+import json
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 from rest_framework import status
-from core.models import RecipeBook, Recipe
-from recipe.serializers import RecipeBookSerializer
+from core.models import RecipeBook, Recipe, Tag, Ingredient
+from recipe.serializers import RecipeBookSerializer, RecipeBookDetailSerializer
 
 RECIPE_BOOK_URL = reverse("recipe:recipebook-list")
 
 
+def detail_url(recipe_book_id):
+    return reverse("recipe:recipebook-detail", args=[recipe_book_id])
+
+
+def export_url(recipe_book_id):
+    return reverse("recipe:recipebook-export", args=[recipe_book_id])
+
+
 def create_sample_recipe(user, **kwargs):
     defaults = {"title": "Cheesecake", "time_minutes": 5, "price": 8.00}
     defaults.update(kwargs)
@@ -42,4 +54,119 @@ class PrivateRecipeBookAPITests(TestCase):
         res = self.client.get(RECIPE_BOOK_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data[0], serialized_rb.data)
+        self.assertEqual(res.data["results"][0], serialized_rb.data)
+
+    def test_create_recipe_book(self):
+        recipe = create_sample_recipe(self.user)
+        payload = {"title": "Desserts", "recipes": [recipe.id]}
+
+        res = self.client.post(RECIPE_BOOK_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe_book = RecipeBook.objects.get(id=res.data["id"])
+        self.assertEqual(list(recipe_book.recipes.all()), [recipe])
+
+    def test_create_recipe_book_with_other_users_recipe_fails(self):
+        user2 = get_user_model().objects.create(
+            email="other@test.com", password="1234567"
+        )
+        payload = {"title": "Desserts", "recipes": [create_sample_recipe(user2).id]}
+
+        res = self.client.post(RECIPE_BOOK_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(RecipeBook.objects.exists())
+
+    def test_adding_recipe_invalidates_cached_detail(self):
+        recipe_book = RecipeBook.objects.create(user=self.user, title="My Book")
+        etag = self.client.get(detail_url(recipe_book.id))["ETag"]
+
+        recipe_book.recipes.add(create_sample_recipe(self.user))
+        res = self.client.get(detail_url(recipe_book.id), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["recipes"]), 1)
+
+    def _add_recipes(self, recipe_book, count):
+        for i in range(count):
+            recipe = create_sample_recipe(self.user, title=f"Recipe {i}")
+            tag, _ = Tag.objects.get_or_create(user=self.user, name=f"Tag {i}")
+            ingredient, _ = Ingredient.objects.get_or_create(
+                user=self.user, name=f"Ingredient {i}"
+            )
+            recipe.tags.add(tag)
+            recipe.ingredients.add(ingredient)
+            recipe_book.recipes.add(recipe)
+
+    def test_get_recipe_book_detail(self):
+        recipe_book = RecipeBook.objects.create(user=self.user, title="My Book")
+        self._add_recipes(recipe_book, 2)
+        serialized_rb = RecipeBookDetailSerializer(recipe_book)
+
+        res = self.client.get(detail_url(recipe_book.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, serialized_rb.data)
+
+    def test_get_recipe_book_detail_without_recipes(self):
+        """Test omitting the nested recipes skips loading them"""
+        recipe_book = RecipeBook.objects.create(user=self.user, title="My Book")
+        self._add_recipes(recipe_book, 2)
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(detail_url(recipe_book.id), {"omit": "recipes"})
+
+        self.assertEqual(res.data, {"id": recipe_book.id, "title": "My Book"})
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_get_recipe_book_detail_query_count_is_constant(self):
+        """Test retrieving a book does not issue queries per nested recipe"""
+        recipe_book = RecipeBook.objects.create(user=self.user, title="My Book")
+        self._add_recipes(recipe_book, 1)
+
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(detail_url(recipe_book.id))
+
+        self._add_recipes(recipe_book, 10)
+
+        with CaptureQueriesContext(connection) as many:
+            res = self.client.get(detail_url(recipe_book.id))
+
+        self.assertEqual(len(res.data["recipes"]), 11)
+        self.assertEqual(len(few.captured_queries), len(many.captured_queries))
+
+    def test_get_recipe_book_detail_skips_search_vectors(self):
+        recipe_book = RecipeBook.objects.create(user=self.user, title="My Book")
+        self._add_recipes(recipe_book, 1)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(detail_url(recipe_book.id))
+
+        self.assertFalse(any("search_vector" in q["sql"] for q in ctx.captured_queries))
+
+    def test_export_recipe_book(self):
+        """Test a book export streams only the recipes in the book"""
+        recipe_book = RecipeBook.objects.create(user=self.user, title="My Book")
+        self._add_recipes(recipe_book, 2)
+        create_sample_recipe(self.user, title="Not in the book")
+
+        res = self.client.get(export_url(recipe_book.id), {"fields": "title"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn(
+            f'filename="recipebook-{recipe_book.id}.ndjson"',
+            res["Content-Disposition"],
+        )
+        body = b"".join(res.streaming_content).decode()
+        self.assertEqual(
+            [json.loads(line) for line in body.splitlines()],
+            [{"title": "Recipe 0"}, {"title": "Recipe 1"}],
+        )
+
+    def test_export_other_users_recipe_book_fails(self):
+        other = get_user_model().objects.create(email="other@test.com")
+        recipe_book = RecipeBook.objects.create(user=other, title="Their Book")
+
+        res = self.client.get(export_url(recipe_book.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
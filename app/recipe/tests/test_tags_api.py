@@ -1,6 +1,11 @@
+import base64
+from urllib.parse import urlencode
+
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.urls import reverse
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -9,8 +14,9 @@ from core.models import Tag, Recipe
 
 from recipe.serializers import TagSerializer
 
-
 TAGS_URL = reverse("recipe:tag-list")
+TAGS_BULK_URL = reverse("recipe:tag-bulk")
+AUTOCOMPLETE_URL = reverse("recipe:tag-autocomplete")
 
 
 class PublicTagsAPITests(TestCase):
@@ -42,7 +48,27 @@ class PrivateTagsAPITests(TestCase):
         tags = Tag.objects.all().order_by("-name")
         serializer = TagSerializer(tags, many=True)
 
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
+
+    def test_tags_are_paginated_by_name(self):
+        for name in ("Breakfast", "Dinner", "Lunch", "Snack", "Vegan"):
+            Tag.objects.create(user=self.user, name=name)
+
+        first = self.client.get(TAGS_URL, {"page_size": 3})
+        second = self.client.get(first.data["next"])
+
+        names = [tag["name"] for tag in first.data["results"]]
+        names += [tag["name"] for tag in second.data["results"]]
+        self.assertEqual(names, ["Vegan", "Snack", "Lunch", "Dinner", "Breakfast"])
+        self.assertIsNone(second.data["next"])
+
+    def test_retrieve_tags_with_sparse_fields(self):
+        Tag.objects.create(user=self.user, name="Vegan")
+
+        res = self.client.get(TAGS_URL, {"fields": "id"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(res.data["results"][0]), ["id"])
 
     def test_tags_are_limited_to_user(self):
         self.user2 = get_user_model().objects.create_user(
@@ -55,9 +81,9 @@ class PrivateTagsAPITests(TestCase):
         res = self.client.get(TAGS_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data["results"]), 1)
 
-        self.assertEqual(res.data[0]["name"], "Vegan")
+        self.assertEqual(res.data["results"][0]["name"], "Vegan")
 
     def test_create_tag_successful(self):
         payload = {
@@ -70,6 +96,26 @@ class PrivateTagsAPITests(TestCase):
 
         self.assertTrue(exists)
 
+    def test_bulk_create_tags(self):
+        payload = [{"name": "Vegan"}, {"name": "Dessert"}]
+
+        res = self.client.post(TAGS_BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        names = set(Tag.objects.filter(user=self.user).values_list("name", flat=True))
+        self.assertEqual(names, {"Vegan", "Dessert"})
+
+    def test_bulk_partial_update_tags(self):
+        tag = Tag.objects.create(user=self.user, name="Vegn")
+
+        res = self.client.patch(
+            TAGS_BULK_URL, [{"id": tag.id, "name": "Vegan"}], format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, "Vegan")
+
     def test_create_invalid_tag(self):
 
         payload = {"name": ""}
@@ -91,8 +137,8 @@ class PrivateTagsAPITests(TestCase):
         serializer_tag_1 = TagSerializer(tag1)
         serializer_tag_2 = TagSerializer(tag2)
 
-        self.assertIn(serializer_tag_1.data, res.data)
-        self.assertNotIn(serializer_tag_2.data, res.data)
+        self.assertIn(serializer_tag_1.data, res.data["results"])
+        self.assertNotIn(serializer_tag_2.data, res.data["results"])
 
     def test_retrieve_tags_assigned_are_unique(self):
         tag = Tag.objects.create(user=self.user, name="Desert")
@@ -109,4 +155,150 @@ class PrivateTagsAPITests(TestCase):
 
         res = self.client.get(TAGS_URL, {"assigned_only": 1})
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data["results"]), 1)
+
+    def test_retrieve_tags_with_usage_count(self):
+        """Test tags are annotated with the number of recipes using them"""
+        tag1 = Tag.objects.create(user=self.user, name="Desert")
+        tag2 = Tag.objects.create(user=self.user, name="Lunch")
+        for title in ("Recipe 1", "Recipe 2"):
+            recipe = Recipe.objects.create(
+                title=title, time_minutes=5, price=11.90, user=self.user
+            )
+            recipe.tags.add(tag1)
+
+        res = self.client.get(TAGS_URL, {"usage_count": 1})
+
+        self.assertEqual(
+            res.data["results"],
+            [
+                {"id": tag2.id, "name": "Lunch", "usage_count": 0},
+                {"id": tag1.id, "name": "Desert", "usage_count": 2},
+            ],
+        )
+
+    def test_tags_ordered_by_usage_count(self):
+        """Test walking tags by popularity returns each tag once"""
+        tags = [Tag.objects.create(user=self.user, name=f"T{i}") for i in range(4)]
+        for count, tag in enumerate(tags):
+            for _ in range(count % 3):
+                recipe = Recipe.objects.create(
+                    title="Recipe", time_minutes=5, price=11.90, user=self.user
+                )
+                recipe.tags.add(tag)
+
+        ids = []
+        url = TAGS_URL + "?ordering=-usage_count&page_size=2&fields=id"
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            ids += [tag["id"] for tag in res.data["results"]]
+            url = res.data["next"]
+
+        self.assertEqual(ids, [tags[2].id, tags[1].id, tags[3].id, tags[0].id])
+
+    def test_tags_with_tied_usage_count_paginate_without_offsets(self):
+        """Test pages continue from the last tag however many tags tie"""
+        tags = [Tag.objects.create(user=self.user, name=f"T{i}") for i in range(5)]
+        expected = [tag.id for tag in reversed(tags)]
+
+        ids = []
+        url = TAGS_URL + "?ordering=-usage_count&page_size=2"
+        with CaptureQueriesContext(connection) as ctx:
+            while url:
+                res = self.client.get(url)
+                ids += [tag["id"] for tag in res.data["results"]]
+                previous, url = res.data["previous"], res.data["next"]
+
+            back = []
+            while previous:
+                res = self.client.get(previous)
+                back = [tag["id"] for tag in res.data["results"]] + back
+                previous = res.data["previous"]
+
+        self.assertEqual(ids, expected)
+        self.assertEqual(back, expected[:4])
+        self.assertFalse(any("OFFSET" in q["sql"] for q in ctx.captured_queries))
+
+    def test_tags_invalid_cursor_not_found(self):
+        res = self.client.get(TAGS_URL, {"cursor": "cD1ub3QganNvbg=="})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tags_tampered_cursor_not_found(self):
+        for ordering, position in (
+            ("-name", '["a","x"]'),
+            ("-name", '["a",null]'),
+            ("-usage_count", '["x",1]'),
+            ("-usage_count", "[[1],1]"),
+        ):
+            query = urlencode({"p": position})
+            cursor = base64.b64encode(query.encode()).decode()
+
+            res = self.client.get(TAGS_URL, {"ordering": ordering, "cursor": cursor})
+
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND, position)
+
+    def test_tags_invalid_flags_fail(self):
+        for params in ({"assigned_only": "true"}, {"usage_count": "yes"}):
+            res = self.client.get(TAGS_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(list(params)[0], res.data)
+
+    def test_tags_invalid_ordering_fails(self):
+        res = self.client.get(TAGS_URL, {"ordering": "name"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_retrieve_tags_assigned_without_distinct(self):
+        """Test assigned_only is an EXISTS semi-join instead of a join"""
+        self.client.get(TAGS_URL, {"assigned_only": 1})
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(TAGS_URL, {"assigned_only": 1})
+
+        sql = ctx.captured_queries[-1]["sql"]
+        self.assertIn("EXISTS", sql)
+        self.assertNotIn("DISTINCT", sql)
+
+    def test_autocomplete_tags(self):
+        Tag.objects.create(user=self.user, name="Dessert")
+        Tag.objects.create(user=self.user, name="Dinner")
+        Tag.objects.create(user=self.user, name="Vegan")
+
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": "d"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [tag["name"] for tag in res.data["results"]], ["Dessert", "Dinner"]
+        )
+
+    def test_create_duplicate_tag_fails(self):
+        Tag.objects.create(user=self.user, name="Vegan")
+
+        res = self.client.post(TAGS_URL, {"name": "Vegan"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("name", res.data)
+
+    def test_bulk_tags_with_duplicate_names_fail(self):
+        """Test names taken by other tags or repeated in the request fail"""
+        vegan = Tag.objects.create(user=self.user, name="Vegan")
+        lunch = Tag.objects.create(user=self.user, name="Lunch")
+
+        res = self.client.post(
+            TAGS_BULK_URL,
+            [{"name": "Dinner"}, {"name": "Vegan"}, {"name": "Dinner"}],
+            format="json",
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([bool(errors) for errors in res.data], [False, True, True])
+
+        res = self.client.patch(
+            TAGS_BULK_URL,
+            [{"id": vegan.id, "name": "Vegan"}, {"id": lunch.id, "name": "Vegan"}],
+            format="json",
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([bool(errors) for errors in res.data], [False, True])
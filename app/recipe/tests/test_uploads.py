@@ -0,0 +1,60 @@
+import struct
+import zlib
+
+from django.http import HttpRequest
+from django.core.files.uploadhandler import StopUpload
+from django.test import TestCase, override_settings
+
+from recipe.uploads import RecipeImageUploadHandler
+
+
+def png_chunk(chunk_type, data):
+    body = chunk_type + data
+    return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+
+def png_header(width, height):
+    """Returns the first bytes of a PNG of the given size up to its pixel data"""
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + png_chunk(b"IHDR", ihdr)
+        + png_chunk(b"IDAT", zlib.compress(b"\x00" * 64))
+    )
+
+
+class RecipeImageUploadHandlerTests(TestCase):
+    def setUp(self):
+        self.request = HttpRequest()
+        self.handler = RecipeImageUploadHandler(self.request)
+        self.handler.handle_raw_input(None, {}, 100, b"boundary")
+        self.handler.new_file("image", "bomb.png", "image/png", None)
+
+    def test_decompression_bomb_is_rejected_from_header(self):
+        with self.assertRaises(StopUpload):
+            self.handler.receive_data_chunk(png_header(100000, 100000), 0)
+
+        self.assertEqual(self.request.upload_error, "Image has too many pixels.")
+
+    def test_header_is_probed_from_first_chunk(self):
+        self.handler.receive_data_chunk(png_header(64, 32), 0)
+
+        self.assertEqual(self.handler.file.image_format, "PNG")
+        self.assertEqual(self.handler.file.image_size, (64, 32))
+        self.assertIsNone(self.handler.header)
+
+    @override_settings(RECIPE_IMAGE_MAX_BYTES=10)
+    def test_oversized_upload_is_rejected_while_streaming(self):
+        with self.assertRaises(StopUpload):
+            self.handler.receive_data_chunk(b"x" * 11, 0)
+
+        self.assertEqual(self.request.upload_error, "Image file is too large.")
+
+    def test_unreadable_upload_is_rejected_on_completion(self):
+        self.handler.receive_data_chunk(b"not an image", 0)
+
+        with self.assertRaises(StopUpload):
+            self.handler.file_complete(12)
+
+        self.assertEqual(self.request.upload_error, "Upload a valid image.")
@@ -0,0 +1,128 @@
+import io
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile, UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile, StopUpload
+from django.http import QueryDict
+from django.utils.datastructures import MultiValueDict
+from PIL import Image
+
+IMAGE_FORMATS = ("JPEG", "PNG", "WEBP", "GIF")
+HEADER_BYTES = 256 * 2**10
+
+
+class UnreadableImage(ValueError):
+    """The data does not start with a readable image header"""
+
+
+def probe_image(image_file):
+    """Returns the format and size of an image reading only its header
+
+    Raises ValueError when the file is not an accepted image or has more
+    pixels than allowed, before any pixel data is decoded.
+    """
+    try:
+        with Image.open(image_file) as image:
+            image_format, size = image.format, image.size
+    except Image.DecompressionBombError:
+        raise ValueError("Image has too many pixels.")
+    except (OSError, SyntaxError):
+        raise UnreadableImage("Upload a valid image.")
+
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"Unsupported image format {image_format}.")
+    if size[0] * size[1] > settings.RECIPE_IMAGE_MAX_PIXELS:
+        raise ValueError("Image has too many pixels.")
+
+    return image_format, size
+
+
+class MediaUploadedFile(TemporaryUploadedFile):
+    """An upload streamed to a temporary file inside MEDIA_ROOT
+
+    Keeping the file on the same filesystem as MEDIA_ROOT lets the storage
+    move it into place instead of copying it.
+    """
+
+    def __init__(self, name, content_type, size, charset, content_type_extra=None):
+        directory = os.path.join(settings.MEDIA_ROOT, "upload", "tmp")
+        os.makedirs(directory, exist_ok=True)
+        file = tempfile.NamedTemporaryFile(suffix=".upload", dir=directory)
+        UploadedFile.__init__(
+            self, file, name, content_type, size, charset, content_type_extra
+        )
+        self.image_format = None
+        self.image_size = None
+
+
+class RecipeImageUploadHandler(FileUploadHandler):
+    """Streams recipe images to disk rejecting oversized ones early
+
+    The size limit is enforced as chunks arrive and the image header is
+    probed from the first chunks, so a decompression bomb is refused
+    before the rest of the upload is read. Errors are reported through
+    request.upload_error.
+    """
+
+    field_name = "image"
+
+    def reject(self, message):
+        self.request.upload_error = message
+        if getattr(self, "file", None) is not None:
+            self.file.close()
+            self.file = None
+        raise StopUpload(connection_reset=False)
+
+    def handle_raw_input(
+        self, input_data, META, content_length, boundary, encoding=None
+    ):
+        self.request.upload_error = None
+        if content_length > settings.RECIPE_IMAGE_MAX_BYTES + HEADER_BYTES:
+            # The parser only stops on StopUpload once it reads the body, so
+            # the upload is refused by parsing nothing instead
+            self.request.upload_error = "Image file is too large."
+            return QueryDict(), MultiValueDict()
+
+    def new_file(self, field_name, *args, **kwargs):
+        if field_name != self.field_name:
+            raise SkipFile()
+
+        super().new_file(field_name, *args, **kwargs)
+        self.file = MediaUploadedFile(
+            self.file_name, self.content_type, 0, self.charset, self.content_type_extra
+        )
+        self.header = bytearray()
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > settings.RECIPE_IMAGE_MAX_BYTES:
+            self.reject("Image file is too large.")
+
+        self.file.write(raw_data)
+
+        if self.header is not None:
+            self.header += raw_data
+            self.probe(io.BytesIO(self.header), final=len(self.header) >= HEADER_BYTES)
+
+    def probe(self, image_file, final):
+        try:
+            self.file.image_format, self.file.image_size = probe_image(image_file)
+        except UnreadableImage as exc:
+            if final:
+                self.reject(str(exc))
+            return
+        except ValueError as exc:
+            self.reject(str(exc))
+
+        self.header = None
+
+    def file_complete(self, file_size):
+        if self.header is not None:
+            self.file.seek(0)
+            self.probe(self.file, final=True)
+
+        self.file.seek(0)
+        self.file.size = file_size
+
+        return self.file
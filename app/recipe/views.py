@@ -1,39 +1,460 @@
-from core.models import Tag, Ingredient, Recipe, RecipeBook
-from recipe import serializers
+import os
+
+from core.authentication import CachedTokenAuthentication
+from core.renderers import CSVRenderer, NDJSONRenderer
+from core.models import Tag, Ingredient, Recipe, RecipeBook, recipe_image_variant_path
+from django.core.exceptions import FieldDoesNotExist
+from django.core.files.storage import default_storage
+from django.db import router, transaction
+from django.db.models import Prefetch
+from django.http import Http404, StreamingHttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from recipe import cache, images, serializers
+from recipe.filters import (
+    MATCH_ANY,
+    MATCH_MODES,
+    annotate_usage_count,
+    filter_assigned,
+    filter_by_related,
+)
+from recipe.media import media_response
+from recipe.pagination import (
+    NameCursorPagination,
+    RankedPagination,
+    UsageCursorPagination,
+)
+from recipe.readers import ListReader
+from recipe.search import autocomplete, schedule_search_update, search_recipes
+from recipe.uploads import RecipeImageUploadHandler
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
+
+
+class PrefetchPlanMixin:
+    """Apply the prefetch plan matching the serializer used by each action"""
+
+    prefetch_plans = {}
+
+    def get_prefetch_plan(self):
+        """Returns the related lookups to prefetch for the current action"""
+        return self.prefetch_plans.get(self.action, ())
+
+    def prefetch_queryset(self, queryset):
+        """Prefetches the relations the action's serializer will read"""
+        plan = self.get_prefetch_plan()
+
+        if plan:
+            queryset = queryset.prefetch_related(*plan)
+
+        return queryset
+
+
+def _paginator_ordering(paginator):
+    """Returns the ordering fields of a cursor paginator as a tuple"""
+    ordering = getattr(paginator, "ordering", None) or ()
+
+    return (ordering,) if isinstance(ordering, str) else tuple(ordering)
+
+
+def _lookup_root(lookup):
+    return getattr(lookup, "prefetch_to", lookup).split("__")[0]
+
+
+class SparseFieldsetMixin:
+    """Render and load only the fields chosen with ?fields= and ?omit=
+
+    Applies to safe requests. Unknown field names and selections without
+    any field are a validation error.
+    """
+
+    def get_selected_fields(self):
+        """Returns the names of the fields to render or None for all of them"""
+        if not hasattr(self, "_selected_fields"):
+            self._selected_fields = self.parse_selected_fields()
+
+        return self._selected_fields
+
+    def parse_selected_fields(self):
+        params = self.request.query_params
+
+        if self.request.method not in SAFE_METHODS or not (
+            "fields" in params or "omit" in params
+        ):
+            return None
+
+        available = [
+            name
+            for name, field in self.get_serializer_class()().fields.items()
+            if not field.write_only
+        ]
+        selected = available
+
+        for param, keep in (("fields", True), ("omit", False)):
+            if param not in params:
+                continue
+
+            names = [name.strip() for name in params[param].split(",") if name.strip()]
+            if not names:
+                raise ValidationError(
+                    {param: ["Expected a comma separated list of field names."]}
+                )
+            unknown = [name for name in names if name not in available]
+            if unknown:
+                raise ValidationError(
+                    {param: [f"Unknown fields: {', '.join(unknown)}."]}
+                )
+            selected = [name for name in selected if (name in names) == keep]
+
+        if not selected:
+            raise ValidationError({"fields": ["Select at least one field."]})
+
+        return selected
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["selected_fields"] = self.get_selected_fields()
+
+        return context
+
+    def get_selected_sources(self):
+        """Returns the attribute sources read by each selected field"""
+        serializer = self.get_serializer_class()()
+
+        return {
+            name: serializer.field_columns.get(name, (serializer.fields[name].source,))
+            for name in self.get_selected_fields()
+        }
+
+    def get_prefetch_plan(self):
+        plan = super().get_prefetch_plan()
+
+        if self.get_selected_fields() is None:
+            return plan
+
+        roots = {
+            source.split(".")[0]
+            for sources in self.get_selected_sources().values()
+            for source in sources
+        }
+
+        return tuple(lookup for lookup in plan if _lookup_root(lookup) in roots)
+
+    def sparse_queryset(self, queryset):
+        """Defers the columns no selected field reads"""
+        if self.get_selected_fields() is None:
+            return queryset
+
+        # Cursor pagination reads its ordering fields from every object
+        columns = {
+            field.lstrip("-")
+            for field in _paginator_ordering(self.paginator)
+            if field.lstrip("-") not in queryset.query.annotations
+        }
+
+        for sources in self.get_selected_sources().values():
+            for source in sources:
+                try:
+                    field = queryset.model._meta.get_field(source.split(".")[0])
+                except FieldDoesNotExist:
+                    # Computed from the whole object, every column may be read
+                    return queryset
+                if field.concrete and not field.many_to_many:
+                    columns.add(field.name)
+
+        return queryset.only(*columns)
+
+
+class ReaderListMixin:
+    """Render list responses from values() rows with a ListReader
+
+    The output matches the serializer's while skipping model instances and
+    per field calls. Honours the fields selected by SparseFieldsetMixin.
+    """
+
+    def list(self, request, *args, **kwargs):
+        reader = ListReader(self.get_serializer_class(), self.get_selected_fields())
+        queryset = reader.get_queryset(
+            self.filter_queryset(self.get_queryset()),
+            _paginator_ordering(self.paginator),
+        )
+
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(reader.represent(list(queryset)))
+
+        return self.get_paginated_response(reader.represent(page))
+
+
+EXPORT_RENDERERS = (NDJSONRenderer, CSVRenderer)
+
+
+class ExportMixin:
+    """Stream querysets as NDJSON or CSV without holding them in memory
+
+    Chunks of export_chunk_size rows are read and rendered one at a time.
+    Honours the fields selected by SparseFieldsetMixin.
+    """
+
+    export_chunk_size = 1000
+
+    def export_response(self, queryset, name):
+        """Returns a streaming attachment of every object in queryset"""
+        reader = ListReader(self.get_serializer_class(), self.get_selected_fields())
+        renderer = self.request.accepted_renderer
+        chunks = reader.read_chunks(
+            reader.get_queryset(queryset), self.export_chunk_size
+        )
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type += f"; charset={renderer.charset}"
+
+        response = StreamingHttpResponse(
+            renderer.render_chunks(
+                chunks, [field.field_name for field in reader.fields]
+            ),
+            content_type=content_type,
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="{name}.{renderer.format}"'
+        )
+
+        return response
+
+
+class CachedResponseMixin:
+    """Serve list and retrieve from a per user cache with conditional GETs"""
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        """Returns a cached or freshly built response tagged for revalidation"""
+        version, last_modified = cache.get_user_state(request.user.pk)
+        key = cache.response_key(request, version)
+        etag = f'"{key}"'
+
+        if self.is_not_modified(request, etag, last_modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            data = cache.get_response(key)
+
+            if data is None:
+                response = handler(request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                cache.set_response(key, response.data)
+            else:
+                response = Response(data)
+
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ("Authorization",))
+
+        return response
+
+    def is_not_modified(self, request, etag, last_modified):
+        if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+        if if_none_match is not None:
+            # If-None-Match uses the weak comparison, proxies may weaken tags
+            etags = {
+                tag[2:] if tag.startswith("W/") else tag
+                for tag in parse_etags(if_none_match)
+            }
+            return etag in etags or "*" in etags
+
+        if_modified_since = parse_http_date_safe(
+            request.META.get("HTTP_IF_MODIFIED_SINCE", "")
+        )
+        return if_modified_since is not None and last_modified <= if_modified_since
+
+
+class BulkModelMixin:
+    """Create or partially update many objects in a single request"""
+
+    @action(methods=["POST", "PATCH"], detail=False)
+    def bulk(self, request):
+        """Bulk create (POST) or partially update (PATCH) a list of objects"""
+        if not isinstance(request.data, list):
+            return Response(
+                {"non_field_errors": ["Expected a list of items."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        if request.method == "POST":
+            serializer = self.get_serializer(data=request.data, many=True)
+            response_status = status.HTTP_201_CREATED
+        else:
+            instances, errors = self.get_bulk_instances(request.data)
+            if any(errors):
+                return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+            serializer = self.get_serializer(
+                instances, data=request.data, many=True, partial=True
+            )
+            response_status = status.HTTP_200_OK
+
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            instances = serializer.save(user=request.user)
+            cache.schedule_invalidation(request.user.pk)
+            self.bulk_saved(instances)
+
+        serializer = self.get_serializer(self.get_bulk_results(instances), many=True)
+
+        return Response(serializer.data, status=response_status)
+
+    def get_bulk_instances(self, items):
+        """Returns the user's objects matching each item id and per item errors"""
+        ids = [item.get("id") if isinstance(item, dict) else None for item in items]
+        objects = self.queryset.filter(user=self.request.user).in_bulk(
+            [pk for pk in ids if isinstance(pk, int)]
+        )
+        errors = []
+
+        for pk in ids:
+            if pk is None:
+                errors.append({"id": ["This field is required."]})
+            elif pk not in objects:
+                errors.append({"id": [f'Invalid pk "{pk}" - object does not exist.']})
+            else:
+                errors.append({})
+
+        return [objects.get(pk) for pk in ids], errors
+
+    def bulk_saved(self, instances):
+        """Runs the work that saving each object would otherwise signal"""
+
+    def get_bulk_results(self, instances):
+        """Returns the saved objects ready to be serialized"""
+        return instances
+
+
+# Related objects are rendered in id order, like ListReader does
+RECIPE_RELATIONS = (
+    Prefetch("tags", queryset=Tag.objects.order_by("id")),
+    Prefetch("ingredients", queryset=Ingredient.objects.order_by("id")),
+)
+
+
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
 
 
 class BasicRecipeViewSet(
-    viewsets.GenericViewSet, mixins.ListModelMixin, mixins.CreateModelMixin
+    ReaderListMixin,
+    SparseFieldsetMixin,
+    BulkModelMixin,
+    viewsets.GenericViewSet,
+    mixins.ListModelMixin,
+    mixins.CreateModelMixin,
 ):
     """Basic models view set"""
 
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = NameCursorPagination
+    orderings = {
+        "-name": NameCursorPagination,
+        "-usage_count": UsageCursorPagination,
+    }
 
     def get_queryset(self):
-        assigned_only = bool(int(self.request.query_params.get("assigned_only", 0)))
-
         queryset = self.queryset
 
-        if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+        if _query_param_flag(self.request, "assigned_only"):
+            queryset = filter_assigned(queryset, "recipe")
+        if self.with_usage_count():
+            queryset = annotate_usage_count(queryset, "recipe")
+
+        queryset = queryset.filter(user=self.request.user).order_by("-name")
+
+        return self.sparse_queryset(queryset)
+
+    def get_ordering(self):
+        """Returns the list ordering chosen with ?ordering="""
+        if self.action != "list":
+            return "-name"
+
+        ordering = self.request.query_params.get("ordering", "-name")
+        if ordering not in self.orderings:
+            raise ValidationError(
+                {"ordering": [f"Expected one of {tuple(self.orderings)}."]}
+            )
+
+        return ordering
+
+    def with_usage_count(self):
+        """Returns whether listed objects are annotated with their usage count"""
+        if self.action != "list":
+            return False
+
+        return self.get_ordering() == "-usage_count" or _query_param_flag(
+            self.request, "usage_count"
+        )
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            self._paginator = self.orderings[self.get_ordering()]()
 
-        return queryset.filter(user=self.request.user).order_by("-name").distinct()
+        return self._paginator
+
+    def get_serializer_class(self):
+        if self.action == "list" and self.with_usage_count():
+            return self.usage_serializer_class
+
+        return self.serializer_class
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    def bulk_saved(self, instances):
+        # Bulk renames send no signals to rebuild the recipes' search vectors
+        recipe_ids = self.queryset.filter(
+            pk__in=[instance.pk for instance in instances], recipe__isnull=False
+        ).values_list("recipe", flat=True)
+        schedule_search_update(recipe_ids, router.db_for_write(Recipe))
+
+    @action(detail=False)
+    def autocomplete(self, request):
+        """Returns the best matches for names starting with ?q="""
+        text = request.query_params.get("q", "").strip()
+        if not text:
+            raise ValidationError({"q": ["This query parameter is required."]})
+
+        try:
+            limit = int(request.query_params.get("limit", AUTOCOMPLETE_LIMIT))
+        except ValueError:
+            limit = 0
+        if not 0 < limit <= AUTOCOMPLETE_MAX_LIMIT:
+            raise ValidationError(
+                {"limit": [f"Expected an integer from 1 to {AUTOCOMPLETE_MAX_LIMIT}."]}
+            )
+
+        matches = autocomplete(
+            self.queryset.filter(user=request.user), text[:255], limit
+        )
+
+        return Response({"results": self.get_serializer(matches, many=True).data})
+
 
 class TagViewSet(BasicRecipeViewSet):
     """Manage tags in the database"""
 
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    usage_serializer_class = serializers.TagUsageSerializer
 
 
 class IngredientViewSet(BasicRecipeViewSet):
@@ -41,24 +462,58 @@ class IngredientViewSet(BasicRecipeViewSet):
 
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
+    usage_serializer_class = serializers.IngredientUsageSerializer
 
 
-class RecipeBookViewSet(viewsets.ModelViewSet):
+class RecipeBookViewSet(
+    CachedResponseMixin,
+    ExportMixin,
+    ReaderListMixin,
+    SparseFieldsetMixin,
+    PrefetchPlanMixin,
+    viewsets.ModelViewSet,
+):
     serializer_class = serializers.RecipeBookSerializer
     queryset = RecipeBook.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    prefetch_plans = {
+        "retrieve": (
+            Prefetch(
+                "recipes",
+                queryset=Recipe.objects.defer("search_vector")
+                .order_by("id")
+                .prefetch_related(*RECIPE_RELATIONS),
+            ),
+        ),
+    }
 
     def get_serializer_class(self):
         if self.action == "retrieve":
             return serializers.RecipeBookDetailSerializer
+        elif self.action == "export":
+            return serializers.RecipeSerializer
         return self.serializer_class
 
     def perform_create(self, serializer):
         return serializer.save(user=self.request.user)
 
     def get_queryset(self):
-        return self.queryset.filter(user=self.request.user).order_by("-id")
+        queryset = self.queryset.filter(user=self.request.user).order_by("-id")
+
+        # Selected fields of an export are the exported recipes' fields
+        if self.action == "export":
+            return queryset
+
+        return self.prefetch_queryset(self.sparse_queryset(queryset))
+
+    @action(detail=True, renderer_classes=EXPORT_RENDERERS)
+    def export(self, request, pk=None):
+        """Stream the recipes of a book as NDJSON or CSV"""
+        book = self.get_object()
+        recipes = Recipe.objects.filter(recipebook=book, user=request.user)
+
+        return self.export_response(recipes.order_by("id"), f"recipebook-{book.pk}")
 
 
 def _params_to_ints(qs):
@@ -66,28 +521,92 @@ def _params_to_ints(qs):
     return [int(str_id) for str_id in qs.split(",")]
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+def _query_param_ids(request, name):
+    """Returns the ids of a comma separated query parameter"""
+    value = request.query_params.get(name)
+
+    if not value:
+        return None
+
+    try:
+        return _params_to_ints(value)
+    except ValueError:
+        raise ValidationError({name: ["Expected a comma separated list of ids."]})
+
+
+def _query_param_flag(request, name):
+    """Returns whether a query parameter set to 0 or 1 is on"""
+    value = request.query_params.get(name, "0")
+
+    if value not in ("0", "1"):
+        raise ValidationError({name: ["Expected 0 or 1."]})
+
+    return value == "1"
+
+
+class RecipeViewSet(
+    CachedResponseMixin,
+    ExportMixin,
+    ReaderListMixin,
+    SparseFieldsetMixin,
+    PrefetchPlanMixin,
+    BulkModelMixin,
+    viewsets.ModelViewSet,
+):
     """Manage recipes in the database"""
 
     serializer_class = serializers.RecipeSerializer
-    queryset = Recipe.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    queryset = Recipe.objects.defer("search_vector")
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    prefetch_plans = {
+        "retrieve": RECIPE_RELATIONS,
+        "upload_image": (),
+        "bulk": RECIPE_RELATIONS,
+    }
 
     def get_queryset(self):
-        tags = self.request.query_params.get("tags")
-        ingredients = self.request.query_params.get("ingredients")
+        tag_ids = _query_param_ids(self.request, "tags")
+        ingredient_ids = _query_param_ids(self.request, "ingredients")
+        match = self.request.query_params.get("match", MATCH_ANY)
+
+        if match not in MATCH_MODES:
+            raise ValidationError({"match": [f"Expected one of {MATCH_MODES}."]})
 
         queryset = self.queryset
 
-        if tags:
-            tag_ids = _params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
-        if ingredients:
-            ingredients_ids = _params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredients_ids)
+        if tag_ids:
+            queryset = filter_by_related(queryset, "tags", tag_ids, match)
+        if ingredient_ids:
+            queryset = filter_by_related(queryset, "ingredients", ingredient_ids, match)
 
-        return queryset.filter(user=self.request.user).order_by("-id")
+        queryset = queryset.filter(user=self.request.user).order_by("-id")
+
+        search = self.get_search_text()
+        if search:
+            queryset = search_recipes(queryset, search)
+
+        return self.prefetch_queryset(self.sparse_queryset(queryset))
+
+    def get_search_text(self):
+        """Returns the text recipes are searched for with ?search= on lists"""
+        if self.action != "list":
+            return ""
+
+        return self.request.query_params.get("search", "").strip()
+
+    @property
+    def paginator(self):
+        if self.get_search_text() and not hasattr(self, "_paginator"):
+            self._paginator = RankedPagination()
+
+        return super().paginator
+
+    def initialize_request(self, request, *args, **kwargs):
+        if self.action_map.get(request.method.lower()) == "upload_image":
+            request.upload_handlers = [RecipeImageUploadHandler(request)]
+
+        return super().initialize_request(request, *args, **kwargs)
 
     def get_serializer_class(self):
         if self.action == "retrieve":
@@ -100,14 +619,73 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         return serializer.save(user=self.request.user)
 
+    def bulk_saved(self, instances):
+        # Bulk inserts and through rows send no signals
+        schedule_search_update(
+            [instance.pk for instance in instances], router.db_for_write(Recipe)
+        )
+
+    def get_bulk_results(self, instances):
+        objects = self.prefetch_queryset(Recipe.objects.all()).in_bulk(
+            [instance.pk for instance in instances]
+        )
+
+        return [objects[instance.pk] for instance in instances]
+
+    @action(detail=False, renderer_classes=EXPORT_RENDERERS)
+    def export(self, request):
+        """Stream the user's recipes as NDJSON or CSV"""
+        return self.export_response(
+            self.filter_queryset(self.get_queryset()), "recipes"
+        )
+
     @action(methods=["POST"], detail=True, url_path="upload-image")
     def upload_image(self, request, pk=None):
         """Upload a image to a recipe"""
         recipe = self.get_object()
+        previous = recipe.image.name
         serializer = self.get_serializer(recipe, data=request.data)
 
+        if getattr(request, "upload_error", None):
+            return Response(
+                {"image": [request.upload_error]}, status=status.HTTP_400_BAD_REQUEST
+            )
+
         if serializer.is_valid():
-            serializer.save()
+            recipe = serializer.save(image_status=Recipe.IMAGE_PENDING)
+            if previous:
+                images.schedule_delete(previous)
+            images.schedule_variants(recipe)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class RecipeImageView(APIView):
+    """Serve recipe images and their variants to the recipe owner"""
+
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, path):
+        directory, file_name = os.path.split(path)
+        stem = file_name.split(".")[0]
+        recipe = Recipe.objects.filter(
+            user=request.user, image__startswith=f"{directory}/{stem}."
+        ).first()
+
+        if recipe is None or path not in self.get_image_names(recipe):
+            raise Http404
+
+        return media_response(request, path, default_storage.path(path))
+
+    def get_image_names(self, recipe):
+        """Returns the media names of a recipe image and its generated variants"""
+        name = recipe.image.name
+
+        if recipe.image_status != Recipe.IMAGE_READY:
+            return [name]
+
+        return [name] + [
+            recipe_image_variant_path(name, variant) for variant in images.VARIANTS
+        ]